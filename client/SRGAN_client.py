@@ -1,6 +1,7 @@
 import requests
 from utils.client_logger import ClientLogger
 import os
+import time
 class SRGANClient:
     def __init__(self, base_url=os.getenv("API_URL")):
         self.base_url = base_url
@@ -88,26 +89,50 @@ class SRGANClient:
             self.logger.log_error(e, "payment_success")
             return None
 
-    def upscale_image(self, image_bytes, scale_factor, use_decoration, token):
-        """Отправка изображения на апскейлинг"""
+    def upscale_image(self, image_bytes, scale_factor, use_decoration, token, poll_interval=1.0, timeout=600):
+        """Отправка изображения на апскейлинг через очередь задач с ожиданием результата"""
         try:
+            headers = {"Authorization": f"Bearer {token}"}
             files = {"file": image_bytes}
             data = {
                 "scale_factor": scale_factor,
                 "use_decoration": use_decoration
             }
+            # Задача создается сразу, обработка не держит HTTP-соединение открытым
             response = requests.post(
-                f"{self.base_url}/upscale",
+                f"{self.base_url}/jobs",
                 files=files,
                 data=data,
-                headers={"Authorization": f"Bearer {token}"}
+                headers=headers,
+                timeout=60
             )
             
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 402:
+            if response.status_code == 402:
                 return {"error": "Недостаточно средств на балансе"}
-            return {"error": response.text}
+            if response.status_code != 200:
+                return {"error": response.text}
+
+            created = response.json()
+            job = created["job"]
+            deadline = time.time() + timeout
+            while job["status"] not in ("done", "failed"):
+                if time.time() > deadline:
+                    return {"error": "Превышено время ожидания обработки"}
+                time.sleep(poll_interval)
+                response = requests.get(f"{self.base_url}/jobs/{job['id']}", headers=headers, timeout=10)
+                response.raise_for_status()
+                job = response.json()["job"]
+
+            if job["status"] == "failed":
+                return {"error": job.get("error") or "Ошибка при обработке изображения"}
+
+            response = requests.get(f"{self.base_url}/jobs/{job['id']}/result", headers=headers, timeout=120)
+            response.raise_for_status()
+            return {
+                "image_bytes": response.content,
+                "deducted_credits": job["cost"],
+                "remaining_credits": created["remaining_credits"]
+            }
             
         except Exception as e:
             self.logger.log_error(e, "upscale_image")
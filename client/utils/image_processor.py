@@ -1,7 +1,6 @@
 import streamlit as st
 from PIL import Image
 import io
-import base64
 import time
 import os
 
@@ -41,7 +40,7 @@ class ImageProcessor:
                 )
             print(result)
             process_time = time.time() - start_time
-            self.logger.log_response(200 if "image" in result else 400, process_time)
+            self.logger.log_response(200 if "image_bytes" in result else 400, process_time)
             return result
         except Exception as e:
             self.logger.log_error(e, "обработка_запроса")
@@ -51,17 +50,15 @@ class ImageProcessor:
     def show_processed_image(self, image_data, col):
         with col:
             st.subheader("Обработанное изображение")
-            upscaled_image = Image.open(io.BytesIO(base64.b64decode(image_data)))
+            upscaled_image = Image.open(io.BytesIO(image_data))
             st.image(upscaled_image, use_container_width=True)
-            self._create_download_button(upscaled_image)
+            self._create_download_button(image_data)
             self.logger.info("Успешно отображено обработанное изображение")
 
-    def _create_download_button(self, image):
-        buf = io.BytesIO()
-        image.save(buf, format="PNG")
+    def _create_download_button(self, image_data):
         st.download_button(
             label="Скачать изображение",
-            data=buf.getvalue(),
+            data=image_data,
             file_name=f"upscaled_x{st.session_state.scale_factor}{'_enhanced' if st.session_state.use_decoration else ''}.png",
             mime="image/png",
             use_container_width=True,
@@ -99,8 +96,8 @@ class ImageProcessor:
             token=st.session_state.access_token
         )
 
-        if result and "image" in result:
-            self.show_processed_image(result["image"], result_col)
+        if result and "image_bytes" in result:
+            self.show_processed_image(result["image_bytes"], result_col)
             # #Manager Cokey
             token = self.cookie_manager.get_cookie('access_token')
             current_user = self.client.get_current_user(token)
@@ -1,12 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Header, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 import os
 import asyncio
 import gc
+import json
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from functools import cached_property
+from typing import Callable, Optional
 from model_srgan.srgan_wrapper import SRGANWrapper
-import stripe
+from utils.result_cache import ResultCache
+from utils.single_flight import SingleFlight
+from utils.job_queue import JobQueue
+from utils.job_results import JobResultStore
+from utils.admission import AdmissionController, AdmissionSlot
+from utils.metrics import metrics
+from utils.profiling import RequestProfiler
+from utils.upload_guard import BodySizeLimitMiddleware, MULTIPART_OVERHEAD, UploadGuard
+from contextlib import nullcontext
+from utils.image_response import IMAGE_MEDIA_TYPES, FORMAT_MEDIA_TYPES, negotiate_image_type, image_streaming_response
+from utils.server_logger import ServerLogger
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -14,17 +32,19 @@ from db.db_manager import DBManager
 from db.config import settings
 from models.user import *
 from auth.user_auth import UserAuth, oauth2_scheme
-from db.model_db import User
+from db.model_db import User, Job
 
 load_dotenv()
 
 class FastAPIApp:
-    def __init__(self):
+    def __init__(self, started_at: Optional[float] = None):
+        # Момент старта процесса (time.perf_counter) для замера холодного старта
+        self.started_at = started_at or time.perf_counter()
+        self.logger = ServerLogger()
         self.db_manager = DBManager(settings.DB_URL)
         self.auth = UserAuth(self.db_manager)
         self.ready = False
         
-        stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
         self.stripe_public_key = os.environ.get("STRIPE_PUBLIC_KEY")
         
         self.app = FastAPI(
@@ -39,20 +59,94 @@ class FastAPIApp:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=["X-Deducted-Credits", "X-Remaining-Credits", "X-Cache", "X-Profile-Id"],
         )
         
         self.srgan = SRGANWrapper()
+        # Лимиты загрузки проверяются до декодирования и списания кредитов
+        self.uploads = UploadGuard()
+        # Профилирование отдельных запросов (X-Profile или PROFILE_SAMPLE_RATE), по умолчанию выключено
+        self.profiler = RequestProfiler()
+        self.app.add_middleware(
+            BodySizeLimitMiddleware,
+            max_bytes=self.uploads.max_bytes + MULTIPART_OVERHEAD,
+            paths=("/upscale", "/jobs"),
+        )
+        self.result_cache = ResultCache()
+        self.inflight = SingleFlight()
+        self.admission = AdmissionController(self.srgan.planner.estimate_flops)
+        self.admission.fit_largest(self.largest_request_costs())
+        self.jobs = JobQueue(self.process_job)
+        self.job_results = JobResultStore(self.db_manager)
+        # Задачи в общей БД принадлежат реплике: аренда продлевается каждые JOB_HEARTBEAT_S,
+        # задачи с истекшей арендой (реплика упала) помечаются failed с возвратом кредитов
+        self.instance_id = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        self.job_heartbeat = float(os.getenv("JOB_HEARTBEAT_S", 10))
+        self.job_lease = float(os.getenv("JOB_LEASE_S", 60))
+        self.job_maintenance_task: Optional[asyncio.Task] = None
+        self.model_loading: Optional[asyncio.Task] = None
+        self.register_gauges()
         self.setup_routes()
         self.app.add_event_handler("shutdown", self.cleanup)
     
     async def get_current_user(self, token: str = Depends(oauth2_scheme)):
         return await self.auth.get_current_user(token)
 
+    @cached_property
+    def stripe(self):
+        """Клиент Stripe, импортируется при первом платежном запросе"""
+        import stripe
+
+        stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
+        return stripe
+
     async def load_model(self):
         await self.srgan.load_model()
-        self.ready = True
+        if self.srgan.measured_gflops_per_s:
+            self.admission.calibrate(self.srgan.measured_gflops_per_s)
+        if self.srgan.is_ready() and not self.ready:
+            self.logger.info(f"Cold start: model ready {time.perf_counter() - self.started_at:.2f}s after process start")
+        self.ready = self.srgan.is_ready()
+
+    def register_gauges(self):
+        """Глубина очередей и число запросов в работе, вычисляются при каждом чтении /metrics"""
+        metrics.gauge("srgan_model_ready", "Model is loaded and warmed up", lambda: self.srgan.is_ready() and self.srgan.warmed_up)
+        metrics.gauge("srgan_jobs_queued", "Jobs waiting in the queue", lambda: self.jobs.stats()["queued"])
+        metrics.gauge("srgan_jobs_running", "Jobs being processed", lambda: self.jobs.stats()["running"])
+        metrics.gauge("srgan_admission_in_flight", "Requests admitted to inference", lambda: self.admission.in_flight)
+        metrics.gauge("srgan_admission_waiting", "Requests waiting for the compute budget", lambda: self.admission.stats()["waiting"])
+        metrics.gauge("srgan_inference_in_flight", "Distinct inference computations in progress", lambda: self.inflight.stats()["in_flight"])
+        metrics.gauge("srgan_batch_pending", "Generator inputs waiting for a micro-batch", lambda: self.srgan.batcher.stats()["pending"])
+
+    def require_model(self):
+        """503 до загрузки модели: оркестратор направляет трафик по /readyz, клиенты повторяют запрос"""
+        if self.srgan.is_ready():
+            return
+        if self.srgan.loading:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Модель загружается, повторите запрос позже",
+                headers={"Retry-After": "5"}
+            )
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Модель не загружена")
+
+    async def database_reachable(self) -> bool:
+        try:
+            await asyncio.wait_for(self.db_manager.ping(), float(os.getenv("READINESS_DB_TIMEOUT_S", 2)))
+            return True
+        except Exception as e:
+            self.logger.log_error(e, "readiness_db")
+            return False
 
     async def cleanup(self):
+        if self.model_loading is not None and not self.model_loading.done():
+            self.model_loading.cancel()
+        if self.job_maintenance_task is not None:
+            self.job_maintenance_task.cancel()
+        if hasattr(self, "jobs"):
+            await self.jobs.stop()
+        if hasattr(self, "srgan"):
+            self.srgan.shutdown()
         if hasattr(self, "srgan") and hasattr(self.srgan, "model"):
             del self.srgan.model
             gc.collect()
@@ -81,57 +175,403 @@ class FastAPIApp:
                     detail=str(e)
                 )
 
+    async def refund_credits(self, user_id: int, amount: int):
+        """Возврат списанных кредитов пользователю"""
+        async with self.db_manager.get_db() as db:
+            db_user = await db.get(User, user_id)  # Получаем пользователя из текущей сессии
+            if db_user:
+                await self.db_manager.update_user_balance(db_user, amount, db)
+
+    def resolve_encode_options(self, output_format, preset, quality, compress_level, lossless) -> dict:
+        try:
+            return self.srgan.encoder.resolve_options(output_format, preset, quality, compress_level, lossless)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    def result_cache_key(self, contents: bytes, scale_factor: int, use_decoration: bool, encode_options: dict) -> str:
+        return self.result_cache.make_key(contents, scale_factor, use_decoration, sorted(encode_options.items()))
+
+    async def run_upscale(
+        self,
+        contents: bytes,
+        scale_factor: int,
+        use_decoration: bool,
+        encode_options: dict,
+        cache_key: str,
+        progress: Optional[Callable[[float], None]] = None,
+        slot: Optional[AdmissionSlot] = None,
+    ) -> bytes:
+        """Апскейл с объединением одинаковых запросов и сохранением результата в кэш.
+
+        slot - допуск запроса: если запрос запустил вычисление, бюджет удерживается
+        до его завершения, даже когда клиент отключился раньше.
+        """
+        async def compute() -> bytes:
+            image_data = await self.srgan.upscale_image_bytes(contents, scale_factor, use_decoration, encode_options, progress)
+            # В кэш пишет только запустивший вычисление, ожидающие получают тот же результат
+            await self.result_cache.put(cache_key, image_data)
+            return image_data
+
+        # Одинаковые запросы, пришедшие во время обработки, ждут уже идущее вычисление
+        return await self.inflight.do(
+            cache_key, compute, on_start=slot.hold_until if slot is not None else None
+        )
+
+    def largest_request_costs(self) -> list:
+        """Оценки самых больших запросов каждого коэффициента, которые пропускают лимиты
+        загрузки (MAX_SHAPE/MAX_TILED_SHAPE, MAX_UPLOAD_PIXELS) и результата (MAX_OUTPUT_MPIX)"""
+        side = self.srgan.max_input_shape()
+        costs = []
+        for scale_factor in SRGANWrapper.SCALE_FACTORS:
+            pixels = min(
+                side * side, self.uploads.max_pixels, self.srgan.max_output_pixels(scale_factor) // scale_factor ** 2
+            )
+            # Оценка зависит только от числа пикселей входа
+            costs.append(self.admission.estimate(pixels, 1, scale_factor, use_decoration=True))
+        return costs
+
+    def admission_slot(self, size: tuple, cache_key: str, scale_factor: int, use_decoration: bool, can_reject: bool = True):
+        """Допуск запроса к инференсу по оценке его стоимости (size - ширина и высота из заголовка).
+
+        Запрос, идентичный уже выполняющемуся, не занимает бюджет: он только ждет результат.
+        """
+        if self.inflight.in_flight(cache_key):
+            return nullcontext()
+        width, height = size
+        cost = self.admission.estimate(height, width, scale_factor, use_decoration)
+        return self.admission.admit(cost, can_reject)
+
+    async def fail_interrupted_jobs(self, at_startup: bool = False) -> int:
+        """Задачи реплик с истекшей арендой; при старте - и задачи предыдущего запуска этой реплики.
+
+        Незавершенные задачи с тем же INSTANCE_ID при старте могли остаться только от
+        прошлого процесса. Сгенерированный id (хост-pid) после перезапуска другой,
+        поэтому задачи прошлого процесса освобождаются по истечении аренды.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=self.job_lease)
+        previous_owner = self.instance_id if at_startup and os.getenv("INSTANCE_ID") else None
+        async with self.db_manager.get_db() as db:
+            failed = await self.db_manager.fail_interrupted_jobs(db, self.instance_id, stale_before, previous_owner)
+        if failed:
+            self.logger.warning(f"Marked {failed} interrupted jobs as failed with refunds")
+        return failed
+
+    async def job_maintenance(self):
+        """Продление аренды своих задач, освобождение чужих с истекшей арендой и удаление старых результатов"""
+        while True:
+            await asyncio.sleep(self.job_heartbeat)
+            try:
+                async with self.db_manager.get_db() as db:
+                    await self.db_manager.heartbeat_jobs(self.instance_id, db)
+                await self.fail_interrupted_jobs()
+                await self.job_results.cleanup()
+            except Exception as e:
+                self.logger.log_error(e, "job_maintenance")
+
+    async def process_job(self, job_id: str, payload: dict) -> str:
+        """Выполнение задачи из очереди: статус и результат сохраняются в БД, при ошибке кредиты возвращаются"""
+        async with self.db_manager.get_db() as db:
+            db_job = await self.db_manager.claim_job(job_id, self.instance_id, db)
+        if db_job is None:
+            # Аренда истекла, и задача уже помечена failed (с возвратом кредитов) другой репликой
+            return "failed"
+
+        try:
+            # Задача, принятая во время старта, ждет окончания загрузки модели
+            await self.srgan.load_model()
+            # Задачи из очереди не отклоняются по перегрузке, а ждут освобождения бюджета
+            async with self.admission_slot(
+                payload["size"], payload["cache_key"], db_job.scale_factor, db_job.use_decoration, can_reject=False
+            ) as slot:
+                image_data = await self.run_upscale(
+                    payload["contents"],
+                    db_job.scale_factor,
+                    db_job.use_decoration,
+                    payload["encode_options"],
+                    payload["cache_key"],
+                    lambda value: self.jobs.set_progress(job_id, value),
+                    slot
+                )
+            result_path = await self.job_results.save(job_id, db_job.output_format, image_data)
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else "Ошибка при обработке изображения"
+            async with self.db_manager.get_db() as db:
+                await self.db_manager.finish_job(
+                    job_id, self.instance_id, db, refund=True, status="failed", error=str(error)
+                )
+            return "failed"
+
+        async with self.db_manager.get_db() as db:
+            finished = await self.db_manager.finish_job(
+                job_id, self.instance_id, db, status="done", progress=1.0, result_path=result_path
+            )
+        if not finished:
+            # Задача уже завершена ошибкой с возвратом кредитов: результат не выдается
+            await self.job_results.delete(result_path)
+            return "failed"
+        return "done"
+
+    async def get_user_job(self, job_id: str, user: User) -> Job:
+        async with self.db_manager.get_db() as db:
+            db_job = await self.db_manager.get_job(job_id, db)
+        if not db_job or db_job.user_id != user.id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+        return db_job
+
+    def image_response(
+        self, data: bytes, media_type: str, deducted: int, remaining: int, cached: bool = False, profile_id: Optional[str] = None
+    ):
+        """Бинарный ответ с изображением, данные о кредитах передаются в заголовках"""
+        headers = {
+            "X-Deducted-Credits": str(deducted),
+            "X-Remaining-Credits": str(remaining),
+            "X-Cache": "hit" if cached else "miss",
+        }
+        if profile_id:
+            headers["X-Profile-Id"] = profile_id
+        return image_streaming_response(data, media_type, headers)
+
     def setup_routes(self):
         @self.app.on_event("startup")
         async def startup():
             await self.db_manager.create_tables()
-            await self.load_model()
+            await self.fail_interrupted_jobs(at_startup=True)
+            self.job_maintenance_task = asyncio.create_task(self.job_maintenance())
+            # Модель загружается в фоне: порт открывается сразу, готовность - по /readyz
+            self.model_loading = asyncio.create_task(self.load_model())
+            self.jobs.start()
         
         @self.app.get("/")
         async def root_path():
             return {"status": "success", "response": "root"}
+
+        @self.app.get("/healthz")
+        async def healthz():
+            """Liveness: процесс жив и обслуживает event loop"""
+            return {"status": "alive"}
+
+        @self.app.get("/readyz")
+        async def readyz():
+            """Readiness: модель загружена и прогрета, БД доступна"""
+            checks = {
+                "model_loaded": self.srgan.is_ready(),
+                "warmed_up": self.srgan.warmed_up,
+                "database": await self.database_reachable(),
+            }
+            ready = all(checks.values())
+            content = {"status": "ready" if ready else "not_ready", "checks": checks}
+            if self.srgan.load_error:
+                content["model_error"] = self.srgan.load_error
+            return JSONResponse(content, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        @self.app.get("/stats")
+        async def inference_stats():
+            return {
+                "status": "success",
+                "stats": {
+                    **self.srgan.stats(),
+                    "result_cache": self.result_cache.stats(),
+                    "single_flight": self.inflight.stats(),
+                    "jobs": self.jobs.stats(),
+                    "admission": self.admission.stats(),
+                    "uploads": self.uploads.stats(),
+                    "profiling": self.profiler.stats()
+                }
+            }
     
+        @self.app.get("/metrics")
+        async def prometheus_metrics():
+            """Метрики в текстовом формате Prometheus"""
+            return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
         @self.app.post("/upscale")
         async def upscale_image(
             file: UploadFile = File(...),
             scale_factor: int = Form(4),
             use_decoration: bool = Form(False),
+            output_format: Optional[str] = Form(None),
+            preset: Optional[str] = Form(None),
+            quality: Optional[int] = Form(None),
+            compress_level: Optional[int] = Form(None),
+            lossless: Optional[bool] = Form(None),
+            accept: Optional[str] = Header(None),
+            x_profile: Optional[str] = Header(None),
             current_user: User = Depends(self.get_current_user)
         ):
-            if not hasattr(self.srgan, "model") or self.srgan.model is None:
-                raise HTTPException(status_code=500, detail="Модель не загружена")
+            self.require_model()
+            self.srgan.check_scale_factor(scale_factor)
 
-            try:
-                # Списание кредитов
-                deducted, updated_user = await self.deduct_credits(current_user, scale_factor, use_decoration)
-            except HTTPException as e:
-                raise e
+            # Accept: image/png|image/webp|image/jpeg - бинарный ответ, иначе JSON с base64.
+            # Явный output_format имеет приоритет над форматом из Accept
+            media_type = negotiate_image_type(accept)
+            if output_format is None:
+                output_format = IMAGE_MEDIA_TYPES[media_type] if media_type else "png"
+            encode_options = self.resolve_encode_options(output_format, preset, quality, compress_level, lossless)
+            if media_type:
+                media_type = FORMAT_MEDIA_TYPES[encode_options["format"]]
 
-            try:
-                # Попытка обработки изображения
-                contents = await file.read()
-                result = await self.srgan.upscale_image(contents, scale_factor, use_decoration)
-            except HTTPException as e:
-                # Возврат кредитов при ошибках валидации (например, большой размер)
-                async with self.db_manager.get_db() as db:
-                    db_user = await db.get(User, current_user.id)  # Получаем пользователя из текущей сессии
-                    if db_user:
-                        await self.db_manager.update_user_balance(db_user, deducted, db)
-                raise e  # Пробрасываем ошибку клиенту
-            except Exception as e:
-                # Возврат кредитов при других ошибках
-                async with self.db_manager.get_db() as db:
-                    db_user = await db.get(User, current_user.id)  # Получаем пользователя из текущей сессии
-                    if db_user:
-                        await self.db_manager.update_user_balance(db_user, deducted, db)
-                raise HTTPException(status_code=500, detail="Ошибка при обработке изображения")
+            # Размер файла, формат и размеры изображения проверяются по заголовку, до декодирования
+            contents = await self.uploads.read(file)
+            header = self.uploads.inspect(contents, self.srgan.max_input_shape())
+            self.srgan.check_output_size(header.width, header.height, scale_factor)
 
-            return {
+            # Повторная отправка того же изображения отдается из кэша без инференса и списания
+            cache_key = self.result_cache_key(contents, scale_factor, use_decoration, encode_options)
+            cached = await self.result_cache.get(cache_key)
+            if cached is not None:
+                if media_type:
+                    return self.image_response(cached, media_type, 0, current_user.money, cached=True)
+                return {
+                    "status": "success",
+                    "image": self.srgan.encode_base64(cached, scale_factor, use_decoration),
+                    "format": encode_options["format"],
+                    "deducted_credits": 0,
+                    "remaining_credits": current_user.money,
+                    "cached": True
+                }
+
+            # Допуск по бюджету вычислений и памяти до списания кредитов: при перегрузке 429 + Retry-After
+            async with self.admission_slot((header.width, header.height), cache_key, scale_factor, use_decoration) as slot:
+                try:
+                    # Списание кредитов
+                    deducted, updated_user = await self.deduct_credits(current_user, scale_factor, use_decoration)
+                except HTTPException as e:
+                    raise e
+
+                try:
+                    # Попытка обработки изображения
+                    run = lambda: self.run_upscale(contents, scale_factor, use_decoration, encode_options, cache_key, slot=slot)
+                    profile_id = None
+                    if self.profiler.requested(x_profile):
+                        image_data, profile_id = await self.profiler.run("upscale", run)
+                    else:
+                        image_data = await run()
+                except HTTPException as e:
+                    # Возврат кредитов при ошибках валидации (например, большой размер)
+                    await self.refund_credits(current_user.id, deducted)
+                    raise e  # Пробрасываем ошибку клиенту
+                except Exception as e:
+                    # Возврат кредитов при других ошибках
+                    await self.refund_credits(current_user.id, deducted)
+                    raise HTTPException(status_code=500, detail="Ошибка при обработке изображения")
+
+            if media_type:
+                return self.image_response(image_data, media_type, deducted, updated_user.money, profile_id=profile_id)
+
+            response = {
                 "status": "success", 
-                "image": result,
+                "image": self.srgan.encode_base64(image_data, scale_factor, use_decoration),
+                "format": encode_options["format"],
                 "deducted_credits": deducted,
                 "remaining_credits": updated_user.money
             }
+            if profile_id:
+                response["profile_id"] = profile_id
+            return response
+
+        @self.app.post("/jobs")
+        async def create_job(
+            file: UploadFile = File(...),
+            scale_factor: int = Form(4),
+            use_decoration: bool = Form(False),
+            output_format: str = Form("png"),
+            preset: Optional[str] = Form(None),
+            quality: Optional[int] = Form(None),
+            compress_level: Optional[int] = Form(None),
+            lossless: Optional[bool] = Form(None),
+            current_user: User = Depends(self.get_current_user)
+        ):
+            """Постановка апскейла в очередь: id задачи возвращается сразу"""
+            self.require_model()
+            self.srgan.check_scale_factor(scale_factor)
+
+            encode_options = self.resolve_encode_options(output_format, preset, quality, compress_level, lossless)
+            contents = await self.uploads.read(file)
+            header = self.uploads.inspect(contents, self.srgan.max_input_shape())
+            self.srgan.check_output_size(header.width, header.height, scale_factor)
+            # Запрос, который не уместится в бюджет допуска, отклоняется до списания кредитов
+            cost = self.admission.estimate(header.height, header.width, scale_factor, use_decoration)
+            self.admission.check(cost)
+            cache_key = self.result_cache_key(contents, scale_factor, use_decoration, encode_options)
+            job_id = uuid.uuid4().hex
+            job_data = {
+                "id": job_id,
+                "user_id": current_user.id,
+                "scale_factor": scale_factor,
+                "use_decoration": use_decoration,
+                "encode_options": json.dumps(encode_options),
+                "output_format": encode_options["format"],
+                "owner": self.instance_id,
+                "heartbeat_at": datetime.utcnow(),
+            }
+
+            # Результат уже в кэше: задача сразу завершена, кредиты не списываются
+            cached = await self.result_cache.get(cache_key)
+            if cached is not None:
+                # done выставляется вместе с result_path после записи результата, иначе GET между ними получит 410
+                async with self.db_manager.get_db() as db:
+                    await self.db_manager.add_job({**job_data, "status": "running"}, db)
+                try:
+                    result_path = await self.job_results.save(job_id, encode_options["format"], cached)
+                except Exception:
+                    async with self.db_manager.get_db() as db:
+                        await self.db_manager.finish_job(
+                            job_id, self.instance_id, db, status="failed", error="Ошибка при сохранении результата"
+                        )
+                    raise
+                async with self.db_manager.get_db() as db:
+                    await self.db_manager.finish_job(
+                        job_id, self.instance_id, db, status="done", progress=1.0, result_path=result_path
+                    )
+                    db_job = await self.db_manager.get_job(job_id, db)
+                return {"status": "success", "job": db_job.to_public(), "remaining_credits": current_user.money}
+
+            # Кредиты списываются при создании задачи и возвращаются, если она завершится ошибкой
+            deducted, updated_user = await self.deduct_credits(current_user, scale_factor, use_decoration)
+            async with self.db_manager.get_db() as db:
+                db_job = await self.db_manager.add_job({**job_data, "cost": deducted}, db)
+            try:
+                # Очередь задач упорядочена по оценке стоимости (SJF со старением)
+                await self.jobs.submit(job_id, {
+                    "contents": contents,
+                    "size": (header.width, header.height),
+                    "encode_options": encode_options,
+                    "cache_key": cache_key,
+                }, cost.gflops)
+            except asyncio.QueueFull:
+                await self.refund_credits(current_user.id, deducted)
+                async with self.db_manager.get_db() as db:
+                    await self.db_manager.update_job(job_id, db, status="failed", error="Очередь задач переполнена")
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Очередь задач переполнена")
+
+            return {"status": "success", "job": db_job.to_public(), "remaining_credits": updated_user.money}
+
+        @self.app.get("/jobs/{job_id}")
+        async def get_job(job_id: str, current_user: User = Depends(self.get_current_user)):
+            db_job = await self.get_user_job(job_id, current_user)
+            job = db_job.to_public()
+            progress = self.jobs.progress(job_id)
+            if job.status == "running" and progress is not None:
+                job.progress = progress
+            return {"status": "success", "job": job}
+
+        @self.app.get("/jobs/{job_id}/result")
+        async def get_job_result(job_id: str, current_user: User = Depends(self.get_current_user)):
+            db_job = await self.get_user_job(job_id, current_user)
+            if db_job.status != "done":
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Задача не завершена (статус: {db_job.status})"
+                )
+            data = await self.job_results.load(db_job.result_path)
+            if data is None:
+                # Результат удален по сроку хранения (JOB_RESULT_TTL_S)
+                raise HTTPException(status_code=status.HTTP_410_GONE, detail="Результат задачи недоступен")
+            return image_streaming_response(
+                data,
+                FORMAT_MEDIA_TYPES[db_job.output_format],
+                {"Content-Disposition": f'attachment; filename="{job_id}.{db_job.output_format}"'}
+            )
 
         @self.app.post("/register", response_model=UserPublic)
         async def register_user(user: UserCreate):
@@ -179,7 +619,7 @@ class FastAPIApp:
         @self.app.get("/products")
         async def get_products():
             try:
-                products = stripe.Product.list(active=True, expand=['data.default_price'])
+                products = self.stripe.Product.list(active=True, expand=['data.default_price'])
                 return {
                     "status": "success",
                     "products": products.data,
@@ -195,7 +635,7 @@ class FastAPIApp:
         ):
             try:
                 BASE_URL = os.environ.get("BASE_URL", "http://localhost:8501")
-                checkout_session = stripe.checkout.Session.create(
+                checkout_session = self.stripe.checkout.Session.create(
                     payment_method_types=['card'],
                     line_items=[{"price": price_id, "quantity": 1}],
                     mode='payment',
@@ -218,8 +658,8 @@ class FastAPIApp:
         ):
             try:
                 # 1. Получаем данные из Stripe
-                product = stripe.Product.retrieve(product_id)
-                session = stripe.checkout.Session.retrieve(session_id)
+                product = self.stripe.Product.retrieve(product_id)
+                session = self.stripe.checkout.Session.retrieve(session_id)
                 
                 # 2. Проверяем статус платежа
                 if session.payment_status != 'paid':
@@ -256,7 +696,7 @@ class FastAPIApp:
                     "session_id": session_id
                 }
                 
-            except stripe.error.StripeError as e:
+            except self.stripe.error.StripeError as e:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Stripe error: {str(e)}"
@@ -1,15 +1,26 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
-    DB_HOST: str
-    DB_PORT: int
-    DB_USER: str
-    DB_PASS: str
-    DB_NAME: str
+    DB_HOST: str = ""
+    DB_PORT: int = 5432
+    DB_USER: str = ""
+    DB_PASS: str = ""
+    DB_NAME: str = ""
+    # Полный URL БД вместо DB_* (например, sqlite+aiosqlite:///load_test.db для нагрузочного теста)
+    DATABASE_URL: str = ""
+
+    @model_validator(mode="after")
+    def check_database(self):
+        if not self.DATABASE_URL and not (self.DB_HOST and self.DB_USER and self.DB_NAME):
+            raise ValueError("Не заданы параметры БД: DATABASE_URL или DB_HOST, DB_USER, DB_NAME")
+        return self
 
     @property
     def DB_URL(self):
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
     model_config = SettingsConfigDict(env_file=".env")
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,11 +1,14 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.future import select
+from sqlalchemy import and_, delete, or_, text, update
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from datetime import datetime
+from typing import AsyncGenerator, Optional
 from models.user import *
 from passlib.context import CryptContext
-from db.model_db import User, Base
+from db.model_db import User, Job, JobResult, Base
+from utils.metrics import timed_db
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -20,6 +23,12 @@ class DBManager:
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
 
+    @timed_db
+    async def ping(self):
+        """Проверка доступности БД (исключение, если соединение недоступно)"""
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
     @asynccontextmanager
     async def get_db(self) -> AsyncGenerator[AsyncSession, None]:
         async with self.async_session() as session:
@@ -32,6 +41,7 @@ class DBManager:
             finally:
                 await session.close()
 
+    @timed_db
     async def add_user(self, user_data, db: AsyncSession) -> User:
         hashed_password = pwd_context.hash(user_data.password)
         db_user = User(email=user_data.email, hashed_password=hashed_password)
@@ -40,16 +50,19 @@ class DBManager:
         await db.refresh(db_user)
         return db_user
 
+    @timed_db
     async def get_user_by_email(self, email: str, db: AsyncSession) -> User | None:
         result = await db.execute(select(User).where(User.email == email))
         return result.scalars().first()
 
+    @timed_db
     async def update_user_balance(self, user: User, amount: int, db: AsyncSession) -> User:
         user.money += amount
         await db.commit()
         await db.refresh(user)
         return user
     
+    @timed_db
     async def deduct_credits(self, user: User, amount: int, db: AsyncSession) -> User:
         """Списание кредитов с баланса пользователя"""
         # Получаем актуальную версию пользователя из БД
@@ -63,4 +76,130 @@ class DBManager:
         db_user.money -= amount
         await db.commit()
         await db.refresh(db_user)
-        return db_user
\ No newline at end of file
+        return db_user
+
+    @timed_db
+    async def add_job(self, job_data: dict, db: AsyncSession) -> Job:
+        db_job = Job(**job_data)
+        db.add(db_job)
+        await db.commit()
+        await db.refresh(db_job)
+        return db_job
+
+    @timed_db
+    async def get_job(self, job_id: str, db: AsyncSession) -> Job | None:
+        return await db.get(Job, job_id)
+
+    @timed_db
+    async def update_job(self, job_id: str, db: AsyncSession, **fields) -> Job | None:
+        db_job = await db.get(Job, job_id)
+        if not db_job:
+            return None
+        for name, value in fields.items():
+            setattr(db_job, name, value)
+        await db.commit()
+        await db.refresh(db_job)
+        return db_job
+
+    @timed_db
+    async def claim_job(self, job_id: str, owner: str, db: AsyncSession) -> Job | None:
+        """Перевод задачи в running, если она все еще в очереди у этой реплики (иначе None)"""
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.owner == owner, Job.status == "queued")
+            .values(status="running", heartbeat_at=datetime.utcnow())
+        )
+        await db.commit()
+        if result.rowcount == 0:
+            return None
+        return await db.get(Job, job_id)
+
+    @timed_db
+    async def finish_job(self, job_id: str, owner: str, db: AsyncSession, refund: bool = False, **fields) -> bool:
+        """Завершение выполняемой задачи этой реплики; при refund кредиты возвращаются в той же транзакции.
+
+        False - задача уже не принадлежит реплике (аренда истекла, другая реплика пометила ее failed
+        и вернула кредиты), результат такой задачи не записывается.
+        """
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.owner == owner, Job.status == "running")
+            .values(**fields)
+            .returning(Job.user_id, Job.cost)
+        )
+        row = result.first()
+        if row is None:
+            await db.rollback()
+            return False
+        if refund and row.cost:
+            await db.execute(update(User).where(User.id == row.user_id).values(money=User.money + row.cost))
+        await db.commit()
+        return True
+
+    @timed_db
+    async def heartbeat_jobs(self, owner: str, db: AsyncSession) -> int:
+        """Продление аренды незавершенных задач реплики"""
+        result = await db.execute(
+            update(Job)
+            .where(Job.owner == owner, Job.status.in_(["queued", "running"]))
+            .values(heartbeat_at=datetime.utcnow())
+        )
+        await db.commit()
+        return result.rowcount
+
+    @timed_db
+    async def fail_interrupted_jobs(
+        self, db: AsyncSession, owner: str, stale_before: datetime, previous_owner: Optional[str] = None
+    ) -> int:
+        """Задачи других реплик с истекшей арендой (и задачи предыдущего запуска previous_owner)
+        помечаются ошибкой с возвратом кредитов. Задачи owner и живых реплик не затрагиваются.
+
+        Каждая задача помечается условным UPDATE, поэтому при одновременной проверке
+        несколькими репликами кредиты возвращаются ровно один раз.
+        """
+        expired = and_(
+            or_(Job.owner.is_(None), Job.owner != owner),
+            or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < stale_before),
+        )
+        if previous_owner is not None:
+            expired = or_(expired, Job.owner == previous_owner)
+        interrupted = (Job.status.in_(["queued", "running"]), expired)
+        result = await db.execute(select(Job.id).where(*interrupted))
+        failed = 0
+        for job_id in result.scalars().all():
+            marked = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, *interrupted)
+                .values(status="failed", error="Задача прервана перезапуском или сбоем сервера")
+                .returning(Job.user_id, Job.cost)
+            )
+            row = marked.first()
+            if row is None:
+                continue
+            if row.cost:
+                await db.execute(update(User).where(User.id == row.user_id).values(money=User.money + row.cost))
+            failed += 1
+        await db.commit()
+        return failed
+
+    @timed_db
+    async def add_job_result(self, job_id: str, data: bytes, db: AsyncSession):
+        await db.merge(JobResult(job_id=job_id, data=data, created_at=datetime.utcnow()))
+        await db.commit()
+
+    @timed_db
+    async def get_job_result(self, job_id: str, db: AsyncSession) -> Optional[bytes]:
+        result = await db.execute(select(JobResult.data).where(JobResult.job_id == job_id))
+        return result.scalars().first()
+
+    @timed_db
+    async def delete_job_results(self, db: AsyncSession, job_id: Optional[str] = None, created_before: Optional[datetime] = None) -> int:
+        """Удаление результата задачи или всех результатов старше created_before"""
+        query = delete(JobResult)
+        if job_id is not None:
+            query = query.where(JobResult.job_id == job_id)
+        if created_before is not None:
+            query = query.where(JobResult.created_at < created_before)
+        result = await db.execute(query)
+        await db.commit()
+        return result.rowcount
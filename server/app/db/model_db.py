@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, LargeBinary, String, Text
 from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime
 from models.user import UserPublic
+from models.job import JobPublic
 
 Base = declarative_base()
 
@@ -17,4 +19,44 @@ class User(Base):
             id=self.id,
             email=self.email,
             money=self.money
-        )
\ No newline at end of file
+        )
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    status = Column(String, default="queued", index=True)  # queued -> running -> done | failed
+    progress = Column(Float, default=0.0)
+    scale_factor = Column(Integer)
+    use_decoration = Column(Boolean, default=False)
+    encode_options = Column(Text)  # JSON с параметрами кодирования
+    output_format = Column(String, default="png")
+    cost = Column(Integer, default=0)  # списанные кредиты, возвращаются при ошибке
+    error = Column(String, nullable=True)
+    result_path = Column(String, nullable=True)  # ключ результата в хранилище (db:<id> или путь к файлу)
+    owner = Column(String, nullable=True, index=True)  # INSTANCE_ID реплики, выполняющей задачу
+    heartbeat_at = Column(DateTime, nullable=True)  # продление аренды задачи репликой-владельцем
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_public(self):
+        return JobPublic(
+            id=self.id,
+            status=self.status,
+            progress=self.progress,
+            scale_factor=self.scale_factor,
+            use_decoration=self.use_decoration,
+            output_format=self.output_format,
+            cost=self.cost,
+            error=self.error,
+            created_at=self.created_at,
+            updated_at=self.updated_at
+        )
+
+class JobResult(Base):
+    __tablename__ = "job_results"
+
+    job_id = Column(String, ForeignKey("jobs.id"), primary_key=True)
+    data = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -1,3 +1,8 @@
+import time
+
+# Отсчет холодного старта - до импорта приложения
+STARTED_AT = time.perf_counter()
+
 import asyncio
 from app import FastAPIApp
 from utils.server_logger import ServerLogger
@@ -21,8 +26,8 @@ class Server:
     async def init_app(self):
         """Асинхронная инициализация приложения"""
         self.logger.info("Инициализация приложения...")
-        self.app = FastAPIApp()
-        await self.app.load_model()
+        self.app = FastAPIApp(started_at=STARTED_AT)
+        # Модель загружается один раз, в обработчике startup приложения
         self.logger.info("Приложение инициализировано успешно")
         return self.app
 
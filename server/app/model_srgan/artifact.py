@@ -0,0 +1,56 @@
+import torch
+import torch.nn as nn
+
+from model_srgan.generator import Generator
+from model_srgan.optimization import fold_batchnorm
+
+ARTIFACT_VERSION = 1
+
+
+def _inference_generator(upsampling_blocks: int) -> nn.Module:
+    # Структура генератора без BatchNorm (свертки с bias), как после fold_batchnorm
+    model, _ = fold_batchnorm(Generator(in_channels=3, upsampling_blocks=upsampling_blocks))
+    return model
+
+
+def compile_artifact(checkpoint_path: str, output_path: str, upsampling_blocks: int = 2) -> dict:
+    """Сборка артефакта для инференса из обучающего чекпоинта.
+
+    В артефакт попадают только веса генератора со свернутым BatchNorm
+    (без дискриминатора и состояния оптимизаторов) в раскладке channels_last,
+    сохраненные в zip-формате torch, который загружается через memory mapping.
+    """
+    checkpoint = torch.load(checkpoint_path, map_location="cpu")
+    model = Generator(in_channels=3, upsampling_blocks=upsampling_blocks)
+    model.load_state_dict(checkpoint["generator_state_dict"])
+    model, folded = fold_batchnorm(model)
+
+    # Веса сверток сохраняются в channels_last, как их использует оптимизированный
+    # граф: при загрузке через mmap перевод раскладки не копирует их в память
+    state_dict = {
+        name: tensor.contiguous(memory_format=torch.channels_last) if tensor.dim() == 4 else tensor.contiguous()
+        for name, tensor in model.state_dict().items()
+    }
+    torch.save(
+        {
+            "version": ARTIFACT_VERSION,
+            "upsampling_blocks": upsampling_blocks,
+            "state_dict": state_dict,
+        },
+        output_path,
+    )
+    return {
+        "folded_batchnorm": folded,
+        "parameters": sum(tensor.numel() for tensor in state_dict.values()),
+    }
+
+
+def load_artifact(path: str, device: str = "cpu") -> nn.Module:
+    """Загрузка артефакта через mmap: веса читаются с диска по мере обращения"""
+    artifact = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    if artifact.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия артефакта модели: {artifact.get('version')}")
+    model = _inference_generator(artifact["upsampling_blocks"])
+    # assign=True оставляет в модели тензоры, отображенные из файла, без копирования
+    model.load_state_dict(artifact["state_dict"], assign=True)
+    return model.to(device).eval()
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+
+# torch импортируется внутри функций: модуль подключается при старте до загрузки модели
+BACKENDS = ("torch", "onnx")
+
+
+def export_onnx(model, path: str, opset: int = 17):
+    """Экспорт генератора в ONNX с динамическими batch, высотой и шириной"""
+    import torch
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    sample = torch.rand(1, 3, 64, 64, device=next(model.parameters()).device)
+    torch.onnx.export(
+        model.eval(),
+        (sample,),
+        path,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={
+            "input": {0: "batch", 2: "height", 3: "width"},
+            "output": {0: "batch", 2: "out_height", 3: "out_width"},
+        },
+        opset_version=opset,
+        dynamo=False,
+    )
+
+
+class OnnxGenerator:
+    """Генератор, выполняемый ONNX Runtime (CPU execution provider).
+
+    Вызывается как модуль: принимает и возвращает тензоры 1x3xHxW, но сам
+    проход выполняется ORT над NumPy-буферами без вычислений в torch.
+    """
+
+    def __init__(self, path: str, intra_op_threads: int = 0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0 - по числу физических ядер
+        options.intra_op_num_threads = intra_op_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, pre_image):
+        import torch
+
+        inputs = np.ascontiguousarray(pre_image.detach().cpu().numpy(), dtype=np.float32)
+        output = self.session.run(None, {self.input_name: inputs})[0]
+        return torch.from_numpy(output)
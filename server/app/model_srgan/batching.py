@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import torch
+
+
+class _Pending:
+    def __init__(self):
+        self.items: List[Tuple[torch.Tensor, asyncio.Future, float]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class BatchScheduler:
+    """Динамический микро-батчинг запросов к генератору.
+
+    Тензоры одинаковой формы (целые изображения или тайлы) копятся не дольше
+    max_wait_ms или до max_batch_size штук, затем прогоняются одним батчем,
+    а результаты раздаются ожидающим корутинам.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[torch.Tensor, Any], Awaitable[torch.Tensor]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size or int(os.getenv("BATCH_MAX_SIZE", 4)))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("BATCH_MAX_WAIT_MS", 5))) / 1000
+        self._pending: Dict[tuple, _Pending] = {}
+        self._tasks = set()
+
+        # Статистика эффективности батчинга
+        self.batch_sizes = Counter()
+        self.flush_reasons = Counter()
+        self.total_wait = 0.0
+
+    async def submit(self, item: torch.Tensor, group: Any = None) -> torch.Tensor:
+        """Постановка тензора (1, C, H, W) в очередь, возвращает выход генератора (1, C, H', W').
+
+        В один батч попадают только тензоры одной группы (например, одной модели).
+        """
+        loop = asyncio.get_running_loop()
+        key = (group, tuple(item.shape[1:]), item.dtype)
+        pending = self._pending.setdefault(key, _Pending())
+        future = loop.create_future()
+        pending.items.append((item, future, time.perf_counter()))
+
+        if len(pending.items) >= self.max_batch_size:
+            self._flush(key, "full")
+        elif pending.timer is None:
+            pending.timer = loop.call_later(self.max_wait, self._flush, key, "timeout")
+        return await future
+
+    def _flush(self, key: tuple, reason: str):
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        now = time.perf_counter()
+        self.batch_sizes[len(pending.items)] += 1
+        self.flush_reasons[reason] += 1
+        self.total_wait += sum(now - started for _, _, started in pending.items)
+        task = asyncio.ensure_future(self._run(pending.items, key[0]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items, group):
+        import torch
+
+        futures = [future for _, future, _ in items]
+        try:
+            batch = torch.cat([item for item, _, _ in items]) if len(items) > 1 else items[0][0]
+            output = await self.run_batch(batch, group)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for index, future in enumerate(futures):
+            if not future.done():
+                future.set_result(output[index:index + 1])
+
+    def stats(self) -> dict:
+        batches = sum(self.batch_sizes.values())
+        items = sum(size * count for size, count in self.batch_sizes.items())
+        mean_size = items / batches if batches else 0.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": mean_size,
+            "fill_ratio": mean_size / self.max_batch_size,
+            "mean_wait_ms": self.total_wait / items * 1000 if items else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "flush_reasons": dict(self.flush_reasons),
+            "pending": sum(len(p.items) for p in self._pending.values()),
+        }
@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class BufferPool:
+    """Пул переиспользуемых буферов (тензоры torch и массивы NumPy), ключ - форма и тип.
+
+    acquire-методы возвращают свободный буфер нужной формы или выделяют новый,
+    release возвращает буфер в пул. Содержимое буфера не очищается. Свободные
+    буферы ограничены по суммарному объему: при переполнении вытесняются
+    давно не использованные формы. Пул потокобезопасен (стадии выполняются в
+    пуле потоков инференса).
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, max_bytes: Optional[int] = None):
+        self.enabled = enabled if enabled is not None else os.getenv("BUFFER_POOL", "1") == "1"
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("BUFFER_POOL_MAX_MB", 256)) * 1024 * 1024
+        self._free: "OrderedDict[tuple, list]" = OrderedDict()
+        self._free_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    @staticmethod
+    def _tensor_key(shape: Tuple[int, ...], dtype, device, memory_format) -> tuple:
+        return ("torch", tuple(shape), str(dtype), str(device), str(memory_format))
+
+    @staticmethod
+    def _array_key(shape: Tuple[int, ...], dtype) -> tuple:
+        return ("numpy", tuple(shape), np.dtype(dtype).str)
+
+    def _take(self, key: tuple):
+        with self._lock:
+            buffers = self._free.get(key)
+            if not buffers:
+                self.counters["misses"] += 1
+                return None
+            buffer = buffers.pop()
+            if not buffers:
+                del self._free[key]
+            self._free_bytes -= buffer.nbytes
+            self.counters["hits"] += 1
+            return buffer
+
+    def tensor(self, shape: Tuple[int, ...], dtype=None, device="cpu", memory_format=None):
+        """Тензор заданной формы, непрерывный в раскладке memory_format (по умолчанию NCHW)"""
+        import torch
+
+        dtype = dtype or torch.float32
+        memory_format = memory_format or torch.contiguous_format
+        key = self._tensor_key(shape, dtype, torch.device(device).type, memory_format)
+        buffer = self._take(key) if self.enabled else None
+        if buffer is None:
+            buffer = torch.empty(shape, dtype=dtype, device=device, memory_format=memory_format)
+            self.counters["allocated_bytes"] += buffer.nbytes
+        return buffer
+
+    def array(self, shape: Tuple[int, ...], dtype=np.float32) -> np.ndarray:
+        """Массив NumPy (C-contiguous) заданной формы"""
+        buffer = self._take(self._array_key(shape, dtype)) if self.enabled else None
+        if buffer is None:
+            buffer = np.empty(shape, dtype=dtype)
+            self.counters["allocated_bytes"] += buffer.nbytes
+        return buffer
+
+    def release(self, buffer):
+        """Возврат буфера в пул (подходит и выделенный вне пула); использовать его после этого нельзя"""
+        if not self.enabled or buffer is None:
+            return
+        if isinstance(buffer, np.ndarray):
+            if not (buffer.flags.owndata and buffer.flags.c_contiguous):
+                return
+            key = self._array_key(buffer.shape, buffer.dtype)
+        else:
+            import torch
+
+            # В пул принимаются только собственные непрерывные тензоры, не представления
+            if buffer._base is not None:
+                return
+            if buffer.is_contiguous():
+                memory_format = torch.contiguous_format
+            elif buffer.dim() == 4 and buffer.is_contiguous(memory_format=torch.channels_last):
+                memory_format = torch.channels_last
+            else:
+                return
+            key = self._tensor_key(buffer.shape, buffer.dtype, buffer.device.type, memory_format)
+
+        with self._lock:
+            if buffer.nbytes > self.max_bytes:
+                return
+            self._free.setdefault(key, []).append(buffer)
+            self._free.move_to_end(key)
+            self._free_bytes += buffer.nbytes
+            while self._free_bytes > self.max_bytes:
+                _, buffers = next(iter(self._free.items()))
+                self._free_bytes -= buffers.pop(0).nbytes
+                self.counters["evicted"] += 1
+                if not buffers:
+                    self._free.popitem(last=False)
+
+    def stats(self) -> dict:
+        requests = self.counters["hits"] + self.counters["misses"]
+        return {
+            "enabled": self.enabled,
+            "hits": self.counters["hits"],
+            "misses": self.counters["misses"],
+            "hit_rate": self.counters["hits"] / requests if requests else 0.0,
+            "evicted": self.counters["evicted"],
+            "allocated_mb": self.counters["allocated_bytes"] / 1024 / 1024,
+            "free_mb": self._free_bytes / 1024 / 1024,
+            "free_shapes": len(self._free),
+        }
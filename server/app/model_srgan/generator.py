@@ -69,7 +69,7 @@ class UpsamplingBlock(nn.Module):  #Conv -> PixelShuffle -> PReLU
   
 
 class Generator(nn.Module):
-  def __init__(self, in_channels=3, num_channels=64, num_blocks=16, scale = 2):
+  def __init__(self, in_channels=3, num_channels=64, num_blocks=16, scale = 2, upsampling_blocks = 2):
     super().__init__()
     self.initial = GenBlock(
         in_channels,
@@ -92,8 +92,7 @@ class Generator(nn.Module):
     )
 
     self.upsampling_blocks = nn.Sequential(
-        UpsamplingBlock(num_channels, scale),
-        UpsamplingBlock(num_channels, scale)
+        *[UpsamplingBlock(num_channels, scale) for _ in range(upsampling_blocks)]
     )
 
     self.final = nn.Conv2d(num_channels, in_channels, kernel_size=9, stride=1, padding=4)
@@ -0,0 +1,134 @@
+import copy
+import time
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from model_srgan.generator import GenBlock
+
+
+def fold_batchnorm(model: nn.Module) -> tuple[nn.Module, int]:
+    """Вливание BatchNorm в веса и bias предшествующей свертки (только для eval).
+
+    Возвращает копию модели без слоев BatchNorm и количество свернутых слоев.
+    """
+    model = copy.deepcopy(model).eval()
+    folded = 0
+    for module in model.modules():
+        if isinstance(module, GenBlock) and hasattr(module.block, "BatchNorm"):
+            module.block.Conv = fuse_conv_bn_eval(module.block.Conv, module.block.BatchNorm)
+            delattr(module.block, "BatchNorm")
+            folded += 1
+    return model, folded
+
+
+def has_batchnorm(model: nn.Module) -> bool:
+    return any(isinstance(module, nn.BatchNorm2d) for module in model.modules())
+
+
+def _measure(model: nn.Module, sample: torch.Tensor, iterations: int) -> float:
+    with torch.no_grad():
+        model(sample)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            model(sample)
+    return (time.perf_counter() - started) / iterations
+
+
+def optimize_for_inference(
+    model: nn.Module,
+    device: str = "cpu",
+    sample_size: int = 64,
+    iterations: int = 3,
+    tolerance: float = 1e-3,
+) -> tuple[nn.Module, dict]:
+    """Сборка замороженного графа для инференса: BN folding, channels_last, TorchScript.
+
+    Результат сверяется с eager-моделью на случайном входе; при расхождении
+    больше tolerance возвращается исходная модель. Модель без BatchNorm
+    (артефакт со свернутыми весами) не копируется: веса, отображенные из
+    файла, попадают в замороженный граф без копии в анонимную память.
+    """
+    model = model.eval()
+    if has_batchnorm(model):
+        folded_model, folded = fold_batchnorm(model)
+    else:
+        folded_model, folded = model, 0
+    folded_model = folded_model.to(memory_format=torch.channels_last)
+
+    with torch.no_grad():
+        optimized = torch.jit.freeze(torch.jit.script(folded_model))
+
+        sample = torch.rand(1, 3, sample_size, sample_size, device=device)
+        sample_cl = sample.contiguous(memory_format=torch.channels_last)
+        max_diff = (model(sample) - optimized(sample_cl)).abs().max().item()
+
+    report = {
+        "folded_batchnorm": folded,
+        "max_diff": max_diff,
+        "eager_ms": _measure(model, sample, iterations) * 1000,
+        "optimized_ms": _measure(optimized, sample_cl, iterations) * 1000,
+    }
+    report["speedup"] = report["eager_ms"] / report["optimized_ms"]
+    report["applied"] = max_diff <= tolerance
+    return (optimized if report["applied"] else model), report
+
+
+class Float32Module(nn.Module):
+    """Выполнение слоя в fp32 внутри области autocast"""
+
+    def __init__(self, module: nn.Module):
+        super().__init__()
+        self.module = module
+
+    def forward(self, x):
+        with torch.autocast("cpu", enabled=False):
+            return self.module(x.float())
+
+
+def bf16_supported() -> bool:
+    """Аппаратная поддержка bfloat16 в oneDNN (AVX512-BF16/AMX)"""
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def prepare_bf16(
+    model: nn.Module,
+    sample_size: int = 64,
+    iterations: int = 3,
+    tolerance: float = 0.05,
+) -> tuple[nn.Module, dict]:
+    """Подготовка генератора к инференсу под CPU autocast(bfloat16).
+
+    BN сворачивается, модель переводится в channels_last, последняя свертка
+    (и следующий за ней tanh) остается в fp32, чтобы выход в [-1, 1] не терял
+    точность. Результат сверяется с fp32; при расхождении больше tolerance
+    возвращается исходная модель.
+    """
+    model = model.eval()
+    bf16_model, folded = fold_batchnorm(model)
+    if hasattr(bf16_model, "final"):
+        bf16_model.final = Float32Module(bf16_model.final)
+    bf16_model = bf16_model.to(memory_format=torch.channels_last)
+
+    def forward(sample):
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            return bf16_model(sample).float()
+
+    sample = torch.rand(1, 3, sample_size, sample_size)
+    sample_cl = sample.contiguous(memory_format=torch.channels_last)
+    with torch.no_grad():
+        max_diff = (model(sample) - forward(sample_cl)).abs().max().item()
+
+    report = {
+        "folded_batchnorm": folded,
+        "max_diff": max_diff,
+        "fp32_ms": _measure(model, sample, iterations) * 1000,
+        "bf16_ms": _measure(forward, sample_cl, iterations) * 1000,
+    }
+    report["speedup"] = report["fp32_ms"] / report["bf16_ms"]
+    report["applied"] = max_diff <= tolerance
+    return (bf16_model if report["applied"] else model), report
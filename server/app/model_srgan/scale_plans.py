@@ -0,0 +1,116 @@
+import os
+from collections import defaultdict
+from functools import cached_property
+from typing import Callable, Tuple
+
+
+def conv_flops_per_pixel(model, in_channels: int = 3, probe_size: int = 8) -> float:
+    """FLOPs сверток генератора на один пиксель входа.
+
+    Все свертки генератора с шагом 1 и паддингом, поэтому стоимость растет
+    линейно с площадью входа: достаточно одного прогона на маленьком тензоре.
+    """
+    import torch
+    import torch.nn as nn
+
+    total = 0
+
+    def hook(module, inputs, output):
+        nonlocal total
+        kernel = module.kernel_size[0] * module.kernel_size[1]
+        macs = output.numel() * kernel * module.in_channels // module.groups
+        total += 2 * macs
+
+    handles = [m.register_forward_hook(hook) for m in model.modules() if isinstance(m, nn.Conv2d)]
+    try:
+        with torch.no_grad():
+            model(torch.zeros(1, in_channels, probe_size, probe_size))
+    finally:
+        for handle in handles:
+            handle.remove()
+    return total / (probe_size * probe_size)
+
+
+class ScalePlanner:
+    """Планы выполнения для коэффициентов x2/x4/x8 и учет их реальной стоимости.
+
+    x2: "native" - генератор с одним UpsamplingBlock (веса PATH_TO_MODEL_X2),
+        "approx" - x4 по входу, уменьшенному вдвое (в 4 раза дешевле x4),
+        "legacy" - x4 и уменьшение результата вдвое.
+    x8: план x2, затем x4. Без промежуточного уменьшения - только с "native":
+        по умолчанию (auto без весов x2) это "legacy", то есть x4, уменьшение и x4.
+    """
+
+    X2_PLANS = ("native", "approx", "legacy")
+
+    def __init__(self, flops: Callable[[], Tuple[float, float]]):
+        """flops - функция, возвращающая FLOPs на пиксель входа генераторов x4 и x2.
+
+        Вызывается при первой оценке, чтобы создание планировщика не требовало torch.
+        """
+        self._flops = flops
+        self.x2_setting = os.getenv("X2_PLAN", "auto").lower()
+        self.native_x2_available = False
+        self._stats = defaultdict(lambda: {"requests": 0, "total_ms": 0.0, "total_gflops": 0.0})
+
+    @cached_property
+    def _flops_per_pixel(self) -> Tuple[float, float]:
+        return self._flops()
+
+    @property
+    def flops_x4(self) -> float:
+        return self._flops_per_pixel[0]
+
+    @property
+    def flops_x2(self) -> float:
+        return self._flops_per_pixel[1]
+
+    @property
+    def x2_plan(self) -> str:
+        if self.x2_setting == "native" and not self.native_x2_available:
+            return "legacy"
+        if self.x2_setting in self.X2_PLANS:
+            return self.x2_setting
+        return "native" if self.native_x2_available else "legacy"
+
+    def plan_name(self, scale_factor: int) -> str:
+        if scale_factor == 2:
+            return f"x2_{self.x2_plan}"
+        if scale_factor == 8:
+            return f"x8_{self.x2_plan}_x4"
+        return "x4"
+
+    def _x2_flops(self, pixels: float) -> float:
+        plan = self.x2_plan
+        if plan == "native":
+            return self.flops_x2 * pixels
+        if plan == "approx":
+            return self.flops_x4 * pixels / 4
+        return self.flops_x4 * pixels
+
+    def estimate_flops(self, height: int, width: int, scale_factor: int) -> float:
+        """Оценка FLOPs генератора для запроса (без учета декодирования и кодирования)"""
+        pixels = height * width
+        if scale_factor == 2:
+            return self._x2_flops(pixels)
+        if scale_factor == 8:
+            return self._x2_flops(pixels) + self.flops_x4 * pixels * 4
+        return self.flops_x4 * pixels
+
+    def record(self, plan: str, flops: float, elapsed: float):
+        stats = self._stats[plan]
+        stats["requests"] += 1
+        stats["total_ms"] += elapsed * 1000
+        stats["total_gflops"] += flops / 1e9
+
+    def stats(self) -> dict:
+        result = {}
+        for plan, stats in self._stats.items():
+            requests = stats["requests"]
+            result[plan] = {
+                "requests": requests,
+                "mean_ms": stats["total_ms"] / requests,
+                "mean_gflops": stats["total_gflops"] / requests,
+                "gflops_per_s": stats["total_gflops"] / (stats["total_ms"] / 1000) if stats["total_ms"] else 0.0,
+            }
+        return {"x2_plan": self.x2_plan, "plans": result}
@@ -0,0 +1,56 @@
+import os
+from typing import List, Optional, Tuple
+
+
+def parse_shapes(value: str) -> List[Tuple[int, int]]:
+    """Разбор списка форм: "128,96x160" -> [(128, 128), (96, 160)]"""
+    shapes = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        height, _, width = item.lower().partition("x")
+        shapes.append((int(height), int(width or height)))
+    return shapes
+
+
+class ShapeBuckets:
+    """Дополнение входа генератора до одного из канонических размеров.
+
+    Высота и ширина независимо округляются вверх до ближайшего размера из
+    набора, вход дополняется повтором краевых пикселей, а выход обрезается
+    обратно. Генератор видит лишь несколько форм, поэтому примитивы oneDNN и
+    блоки аллокатора переиспользуются, а запросы разных размеров попадают
+    в один микро-батч. Стороны больше наибольшего размера не меняются.
+    """
+
+    def __init__(self, sizes: List[int]):
+        self.sizes = sorted(set(sizes))
+
+    @classmethod
+    def from_env(cls) -> Optional["ShapeBuckets"]:
+        value = os.getenv("SHAPE_BUCKETS", "")
+        sizes = [int(size) for size in value.split(",") if size.strip()]
+        return cls(sizes) if sizes else None
+
+    def bucket(self, length: int) -> int:
+        for size in self.sizes:
+            if size >= length:
+                return size
+        return length
+
+    def shapes(self) -> List[Tuple[int, int]]:
+        return [(size, size) for size in self.sizes]
+
+    def pad(self, image):
+        """Дополнение тензора (N, C, H, W) до канонического размера"""
+        import torch.nn.functional as F
+
+        height, width = image.shape[-2:]
+        pad_bottom = self.bucket(height) - height
+        pad_right = self.bucket(width) - width
+        if pad_bottom == 0 and pad_right == 0:
+            return image
+        return F.pad(image, (0, pad_right, 0, pad_bottom), mode="replicate")
+
+    @staticmethod
+    def crop(output, height: int, width: int, scale: int):
+        """Обрезка выхода генератора до размера исходного входа, умноженного на scale"""
+        return output[:, :, :height * scale, :width * scale]
@@ -1,126 +1,666 @@
 import numpy as np
-import torch
-from model_srgan.generator import Generator
-from transform.transform import Transforms
+from model_srgan.backends import BACKENDS
+from model_srgan.batching import BatchScheduler
+from model_srgan.buffer_pool import BufferPool
+from model_srgan.scale_plans import ScalePlanner
+from model_srgan.shape_buckets import ShapeBuckets, parse_shapes
 import io
 from PIL import Image
 import base64
-from typing import Optional
+from typing import Callable, Optional
 from utils.server_logger import ServerLogger
 import os
-import cv2
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from utils.inference_executor import InferenceExecutor
+from utils.image_encoder import ImageEncoder
+from utils.metrics import STAGE_SECONDS, UPSCALE_SECONDS
+from utils.profiling import record_stage
 
 from fastapi import HTTPException, status
 
+# torch, cv2 и модули генератора импортируются лениво: импорт
+# приложения не тянет их, они загружаются вместе с моделью (см. load_model)
+
+
+# Метки метрик текущего запроса (scale_factor, decoration) для замеров вложенных стадий
+_request_labels: ContextVar[dict] = ContextVar("request_labels", default={"scale_factor": "", "decoration": ""})
+
+
+@contextmanager
+def _timed_stage(stage: str, **labels):
+    """Замер стадии: гистограмма srgan_stage_seconds и журнал профилируемого запроса"""
+    labels = labels or _request_labels.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage, **labels)
+        record_stage(stage, started, elapsed)
+
+
+def _generator_flops() -> tuple:
+    """FLOPs на пиксель входа для генераторов x4 и x2"""
+    from model_srgan.generator import Generator
+    from model_srgan.scale_plans import conv_flops_per_pixel
+
+    return (
+        conv_flops_per_pixel(Generator(in_channels=3)),
+        conv_flops_per_pixel(Generator(in_channels=3, upsampling_blocks=1)),
+    )
+
+
+def _create_worker_wrapper():
+    """Фабрика обертки для процессов-воркеров пула инференса"""
+    wrapper = SRGANWrapper(executor=InferenceExecutor(kind="thread"))
+    wrapper._load_weights()
+    return wrapper
+
+
 class SRGANWrapper:
-    def __init__(self):
+    # Поддерживаемые коэффициенты увеличения (см. ScalePlanner)
+    SCALE_FACTORS = (2, 4, 8)
+
+    def __init__(self, executor: Optional[InferenceExecutor] = None):
         """Инициализация обертки для модели SRGAN"""
         self.logger = ServerLogger()
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = Generator(in_channels=3).to(self.device)
-        self.transform = Transforms()
+        # Устройство выбирается при загрузке модели, вместе с импортом torch
+        self.device = None
+        self.model = None
+        # Генератор x2 с одним UpsamplingBlock, загружается при наличии PATH_TO_MODEL_X2
+        self.model_x2 = None
+        self.planner = ScalePlanner(_generator_flops)
+        self.encoder = ImageEncoder()
+        # Сборка оптимизированного графа (BN folding, channels_last, TorchScript) после загрузки весов
+        self.optimize = os.getenv("OPTIMIZE_MODEL", "1") == "1"
+        self.channels_last = False
+        # Точность инференса: fp32, int8 (статическое квантование) или bf16 (autocast), последние - только CPU
+        self.precision = os.getenv("INFERENCE_PRECISION", "fp32").lower()
+        # Бэкенд инференса: torch (eager/TorchScript) или onnx (ONNX Runtime, CPU)
+        self.backend = os.getenv("INFERENCE_BACKEND", "torch").lower()
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд инференса: {self.backend}")
+        self.executor = executor or InferenceExecutor(worker_factory=_create_worker_wrapper)
+        # Переиспользуемые буферы стадий; в режиме process стадии идут в воркерах со своими пулами
+        self.pool = BufferPool() if self.executor.kind == "thread" else BufferPool(enabled=False)
+        # Тайловый инференс (по умолчанию выключен): по тайлам идут только проходы со стороной
+        # больше MAX_SHAPE, пиковая память генератора ограничена размером тайла
+        self.tile_size = int(os.getenv("TILE_SIZE", 0))
+        self.max_shape = int(os.getenv("MAX_SHAPE", 1000))
+        self.tile_overlap = int(os.getenv("TILE_OVERLAP", 32))
+        # Микро-батчинг одновременных запросов (и тайлов) одинаковой формы
+        self.batcher = BatchScheduler(self._run_batch)
+        # Дополнение входов до канонических размеров (SHAPE_BUCKETS, по умолчанию выключено)
+        self.buckets = ShapeBuckets.from_env()
+        self.warmup = os.getenv("WARMUP", "1") == "1"
         self.ready = False
-        self.logger.info(f"Initialized SRGAN wrapper on device: {self.device}")
-    
+        # Модель прошла прогревочные проходы (пул аллокатора и примитивы oneDNN созданы)
+        self.warmed_up = False
+        # Производительность генератора, замеренная при загрузке (GFLOP/s)
+        self.measured_gflops_per_s: Optional[float] = None
+        self.load_error: Optional[str] = None
+        self._loading: Optional[asyncio.Future] = None
+        self.logger.info("Initialized SRGAN wrapper")
+
     async def load_model(self) -> bool:
-        """Загрузка модели SRGAN"""
+        """Загрузка модели SRGAN (однократная: повторные вызовы ждут первую загрузку)"""
+        if self._loading is None:
+            # torch.load блокирует event loop, поэтому загружаем веса в отдельном потоке
+            self._loading = asyncio.get_running_loop().run_in_executor(None, self._load_weights)
         try:
-            # Для асинхронной загрузки модели используем executor
-            checkpoint = torch.load(os.getenv("PATH_TO_MODEL"),map_location=self.device) # тут загрузка generatora
-            self.model.load_state_dict(checkpoint["generator_state_dict"])
-            
-            self.model.eval()
+            await self._loading
             self.ready = True
             # return True
         except Exception as e:
-            print(f"Ошибка при загрузке модели SRGAN: {e}")
+            self.logger.log_error(e, "load_model")
+            self.load_error = str(e)
             self.ready = False
             # return False
+
+    @property
+    def loading(self) -> bool:
+        return self._loading is not None and not self._loading.done()
+
+    def _load_weights(self):
+        started = time.perf_counter()
+        import torch
+
+        imported = time.perf_counter()
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = self._read_generator("x4")
+        if os.getenv("MODEL_ARTIFACT_X2") or os.getenv("PATH_TO_MODEL_X2"):
+            self.model_x2 = self._read_generator("x2")
+            self.planner.native_x2_available = True
+        loaded = time.perf_counter()
+
+        self.model = self._prepare_model(self.model, "x4")
+        if self.model_x2 is not None:
+            self.model_x2 = self._prepare_model(self.model_x2, "x2")
+        self.logger.info(f"Scale plans: x2={self.planner.plan_name(2)}, x8={self.planner.plan_name(8)}")
+        prepared = time.perf_counter()
+        self._log_throughput()
+        self._warmup()
+        self.warmed_up = True
+        self.logger.info(
+            f"Model loaded on {self.device}: import torch {imported - started:.2f}s, "
+            f"weights {loaded - imported:.2f}s, prepare {prepared - loaded:.2f}s, "
+            f"warmup {time.perf_counter() - prepared:.2f}s, total {time.perf_counter() - started:.2f}s"
+        )
+
+    def warmup_shapes(self) -> list:
+        """Формы прогрева: канонические размеры при SHAPE_BUCKETS, иначе WARMUP_SHAPES и размер тайла"""
+        if self.buckets:
+            shapes = self.buckets.shapes()
+        else:
+            shapes = parse_shapes(os.getenv("WARMUP_SHAPES", "64,128"))
+        if self.tile_size > 0 and (self.tile_size, self.tile_size) not in shapes:
+            shapes.append((self.tile_size, self.tile_size))
+        return shapes
+
+    def _warmup(self):
+        """Прогон генераторов на типичных формах: первые запросы не платят за создание
+        примитивов oneDNN и рост пула аллокатора"""
+        if not self.warmup:
+            return
+        scales = [4, 2] if self.model_x2 is not None else [4]
+        for height, width in self.warmup_shapes():
+            started = time.perf_counter()
+            image = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+            for scale in scales:
+                # Полный проход стадий: заодно импортируются ленивые зависимости (cv2) и наполняется пул буферов
+                pre_image = self._preprocess(image)
+                SR_image = self._forward(pre_image, scale)
+                self.pool.release(pre_image)
+                self.pool.release(self._postprocess(SR_image, use_decoration=True))
+            self.logger.info(f"Warmup {height}x{width} (x{'/x'.join(map(str, scales))}): {time.perf_counter() - started:.2f}s")
+
+    def _weights_path(self, name: str) -> tuple:
+        """Путь к весам генератора name и признак артефакта (иначе - обучающий чекпоинт)"""
+        suffix = "_X2" if name == "x2" else ""
+        artifact = os.getenv(f"MODEL_ARTIFACT{suffix}")
+        if artifact:
+            return artifact, True
+        return os.getenv(f"PATH_TO_MODEL{suffix}"), False
+
+    def _read_generator(self, name: str):
+        path, is_artifact = self._weights_path(name)
+        if is_artifact:
+            from model_srgan.artifact import load_artifact
+
+            return load_artifact(path, self.device)
+
+        import torch
+        from model_srgan.generator import Generator
+
+        checkpoint = torch.load(path, map_location=self.device) # тут загрузка generatora
+        model = Generator(in_channels=3, upsampling_blocks=1 if name == "x2" else 2).to(self.device)
+        model.load_state_dict(checkpoint["generator_state_dict"])
+        return model.eval()
+
+    def _prepare_model(self, model, name: str):
+        if self.backend == "onnx":
+            try:
+                return self._onnx_model(model, name)
+            except Exception as e:
+                self.logger.log_error(e, "model_onnx")
+                self.backend = "torch"
+        if self.precision == "int8":
+            try:
+                return self._quantize_model(model, name)
+            except Exception as e:
+                self.logger.log_error(e, "model_quantization")
+                self.precision = "fp32"
+        elif self.precision == "bf16":
+            bf16_model = self._bf16_model(model, name)
+            if bf16_model is not None:
+                return bf16_model
+            self.precision = "fp32"
+        if self.optimize:
+            return self._optimize_model(model, name)
+        return model
+
+    def _quantize_model(self, model, name: str):
+        from model_srgan.quantization import compare_outputs, load_calibration_images, quantize_generator
+
+        if self.device != "cpu":
+            raise RuntimeError("INT8-квантование поддерживается только на CPU")
+        folder = os.getenv("QUANT_CALIBRATION_DIR")
+        if not folder:
+            raise ValueError("Для INFERENCE_PRECISION=int8 нужен каталог калибровки QUANT_CALIBRATION_DIR")
+        crops = load_calibration_images(
+            folder,
+            max_images=int(os.getenv("QUANT_CALIBRATION_IMAGES", 16)),
+            crop_size=int(os.getenv("QUANT_CALIBRATION_SIZE", 96)),
+        )
+        started = time.perf_counter()
+        samples = [self._preprocess(crop) for crop in crops]
+        try:
+            quantized = quantize_generator(model, samples)
+            self.logger.info(
+                f"Model quantization ({name}): int8, calibrated on {len(crops)} crops from {folder} "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+            # Проверка качества на этом чекпоинте: int8 включается, только если
+            # отклонение от fp32 в пределах QUANT_MIN_PSNR / QUANT_MIN_SSIM
+            quality = compare_outputs(model, quantized, samples[:int(os.getenv("QUANT_CHECK_IMAGES", 4))])
+        finally:
+            # Входы калибровки взяты из пула буферов - возвращаем их
+            for sample in samples:
+                self.pool.release(sample)
+        min_psnr = float(os.getenv("QUANT_MIN_PSNR", 35))
+        min_ssim = float(os.getenv("QUANT_MIN_SSIM", 0.97))
+        self.logger.info(
+            f"Model quantization ({name}): PSNR={quality['psnr']:.2f}dB, SSIM={quality['ssim']:.4f} vs fp32"
+        )
+        if quality["std"] < 0.02:
+            self.logger.warning(
+                f"Model quantization ({name}): fp32 output is nearly constant (std={quality['std']:.4f}), "
+                f"random weights? The quality check is not informative"
+            )
+        if quality["psnr"] < min_psnr or quality["ssim"] < min_ssim:
+            raise ValueError(
+                f"INT8 слишком далек от fp32: PSNR {quality['psnr']:.2f} дБ (нужно {min_psnr}), "
+                f"SSIM {quality['ssim']:.4f} (нужно {min_ssim})"
+            )
+        return quantized
+
+    def _onnx_model(self, model, name: str):
+        if self.precision != "fp32":
+            self.logger.warning(f"INFERENCE_PRECISION={self.precision} is ignored by the onnx backend")
+            self.precision = "fp32"
+        from model_srgan.backends import OnnxGenerator, export_onnx
+
+        source, _ = self._weights_path(name)
+        path = os.path.join(os.getenv("ONNX_MODEL_DIR", "onnx_models"), f"generator_{name}.onnx")
+        # Экспорт повторяется только если чекпоинт новее сохраненного графа
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source):
+            started = time.perf_counter()
+            export_onnx(model, path)
+            self.logger.info(f"Exported {name} generator to ONNX: {path} in {time.perf_counter() - started:.1f}s")
+        session = OnnxGenerator(path, int(os.getenv("ORT_INTRA_OP_THREADS", 0)))
+        self.logger.info(f"ONNX Runtime backend ({name}): {path}, intra_op_threads={os.getenv('ORT_INTRA_OP_THREADS', 0)}")
+        return session
+
+    def _bf16_model(self, model, name: str):
+        from model_srgan.optimization import bf16_supported, prepare_bf16
+
+        if self.device != "cpu" or not bf16_supported():
+            self.logger.warning(f"bfloat16 is not supported on this {self.device.upper()}, falling back to fp32")
+            return None
+        try:
+            bf16_model, report = prepare_bf16(model)
+        except Exception as e:
+            self.logger.log_error(e, "model_bf16")
+            return None
+        self.logger.info(
+            f"Model bf16 autocast ({name}): applied={report['applied']}, max_diff={report['max_diff']:.2e}, "
+            f"fp32={report['fp32_ms']:.1f}ms, bf16={report['bf16_ms']:.1f}ms, speedup={report['speedup']:.2f}x"
+        )
+        if not report["applied"]:
+            return None
+        self.channels_last = True
+        return bf16_model
+
+    def _log_throughput(self):
+        import torch
+        from model_srgan.quantization import measure_throughput
+
+        sample = torch.rand(1, 3, 64, 64, device=self.device)
+        report = measure_throughput(lambda batch: self._forward(batch, 4), sample)
+        # Производительность в GFLOP/s - начальная оценка для контроля допуска
+        flops = self.planner.estimate_flops(64, 64, 4)
+        self.measured_gflops_per_s = flops / 1e9 / (report["latency_ms"] / 1000)
+        self.logger.info(
+            f"Inference backend={self.backend}, precision={self.precision}: x4 64x64 in {report['latency_ms']:.1f}ms, "
+            f"throughput={report['mpix_per_s']:.2f} Mpx/s, {self.measured_gflops_per_s:.0f} GFLOP/s"
+        )
+
+    def _optimize_model(self, model, name: str):
+        from model_srgan.optimization import optimize_for_inference
+
+        try:
+            optimized, report = optimize_for_inference(model, self.device)
+        except Exception as e:
+            self.logger.log_error(e, "model_optimization")
+            return model
+        self.channels_last = self.channels_last or report["applied"]
+        self.logger.info(
+            f"Model optimization ({name}): applied={report['applied']}, "
+            f"folded_bn={report['folded_batchnorm']}, max_diff={report['max_diff']:.2e}, "
+            f"eager={report['eager_ms']:.1f}ms, optimized={report['optimized_ms']:.1f}ms, "
+            f"speedup={report['speedup']:.2f}x"
+        )
+        return optimized
     
     async def upscale_image(self, image_data: bytes, scale_factor: int = 4, use_decoration: bool = False) -> Optional[str]:
-        """Увеличение разрешения изображения с помощью SRGAN"""
-        max_shape = int(os.getenv("MAX_SHAPE", 1000))
+        """Увеличение разрешения изображения с помощью SRGAN (PNG в base64)"""
+        png_data = await self.upscale_image_bytes(image_data, scale_factor, use_decoration)
+        return self.encode_base64(png_data, scale_factor, use_decoration)
+
+    @staticmethod
+    def encode_base64(data: bytes, scale_factor: int, use_decoration: bool) -> str:
+        """Результат в base64 для JSON-ответа (стадия base64 в метриках)"""
+        with _timed_stage("base64", scale_factor=scale_factor, decoration=use_decoration):
+            return base64.b64encode(data).decode("utf-8")
+
+    async def _stage(self, stage: str, func: Callable, *args):
+        """Стадия в пуле инференса с замером длительности (включая ожидание свободного воркера)"""
+        with _timed_stage(stage):
+            return await self.executor.run(func, *args)
+
+    async def upscale_image_bytes(
+        self,
+        image_data: bytes,
+        scale_factor: int = 4,
+        use_decoration: bool = False,
+        encode_options: Optional[dict] = None,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> bytes:
+        """Увеличение разрешения изображения с помощью SRGAN (закодированные байты изображения).
+
+        progress, если передан, вызывается с долей выполнения (0..1) после каждой стадии.
+        """
+        progress = progress or (lambda value: None)
+        max_shape = self.max_input_shape()
 
         if not self.ready or self.model is None:
             self.logger.error("Model not loaded")
             raise RuntimeError("Модель SRGAN не загружена")
 
+        self.check_scale_factor(scale_factor)
+        labels = {"scale_factor": scale_factor, "decoration": use_decoration}
+        token = _request_labels.set(labels)
+        started = time.perf_counter()
+        result = "error"
         try:
-            self.logger.log_image_processing(len(image_data), None)
-            
             if len(image_data) == 0:
                 raise ValueError("Получены пустые данные изображения")
             
-            image_bytes = io.BytesIO(image_data)
-            image_bytes.seek(0)
-            
-            try:
-                img = Image.open(image_bytes)
-                img = img.convert('RGB')
-                self.logger.debug(f"Image opened: format={img.format}, mode={img.mode}")
-            except Exception as img_error:
-                self.logger.log_error(img_error, "image_opening")
-                raise
-            
-            img_array = np.array(img)
-            self.logger.debug(f"Image converted to array: shape={img_array.shape}")
-            
-            if img_array.shape[0] > max_shape or img_array.shape[1] > max_shape:
+            # Размеры проверяются по заголовку, до декодирования пикселей
+            width, height = self.read_image_size(image_data)
+            if height > max_shape or width > max_shape:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Изображение превышает {max_shape}x{max_shape} пикселей"
-                )        
+                )
+            self.check_output_size(width, height, scale_factor)
 
-            SR_image = await self.upscale_x4(use_decoration, img_array)
+            # Все CPU-bound стадии выполняются в пуле инференса, event loop остается свободным
+            img_array = await self._stage("decode", self._decode_image, image_data)
+            self.logger.log_image_processing(len(image_data), img_array.shape)
+            progress(0.1)
 
-            if scale_factor == 2 or scale_factor == 8:
-                SR_image = cv2.resize(SR_image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_LANCZOS4)
-                if scale_factor == 8:
-                    SR_image = np.array(Image.fromarray((SR_image * 255).astype(np.uint8)))
-                    SR_image = await self.upscale_x4(use_decoration, SR_image)
+            SR_image = await self.run_plan(img_array, scale_factor, use_decoration)
+            progress(0.9)
 
-            
-            result_img = Image.fromarray((SR_image * 255).astype(np.uint8))
-            buffer = io.BytesIO()
-            result_img.save(buffer, format="PNG")
-            img_str = base64.b64encode(buffer.getvalue()).decode("utf-8")
-            
-            return img_str
+            # Кодирование тоже идет в пуле и перекрывается с инференсом следующих запросов
+            encode_options = encode_options or self.encoder.resolve_options("png")
+            encoded = await self._stage("encode", self._encode_image, SR_image, encode_options)
+            progress(1.0)
+            result = "ok"
+            return encoded
         except Exception as e:
             self.logger.log_error(e, "upscale_image")
             raise e
+        finally:
+            UPSCALE_SECONDS.observe(time.perf_counter() - started, result=result, **labels)
+            _request_labels.reset(token)
+
+    async def run_plan(self, img_array: np.ndarray, scale_factor: int, use_decoration: bool) -> np.ndarray:
+        """Выполнение плана для коэффициента увеличения с учетом FLOPs и задержки"""
+        plan = self.planner.plan_name(scale_factor)
+        flops = self.planner.estimate_flops(img_array.shape[0], img_array.shape[1], scale_factor)
+        started = time.perf_counter()
+
+        if scale_factor == 2:
+            SR_image = await self.upscale_x2(use_decoration, img_array)
+        elif scale_factor == 8:
+            # x2 и затем x4 по результату: без прогона x4 с последующим уменьшением
+            SR_image = await self.upscale_x2(use_decoration, img_array)
+            x2_image = await self._stage("to_uint8", self._to_uint8, SR_image)
+            self.pool.release(SR_image)
+            SR_image = await self.upscale_x4(use_decoration, x2_image)
+            self.pool.release(x2_image)
+        else:
+            SR_image = await self.upscale_x4(use_decoration, img_array)
+
+        elapsed = time.perf_counter() - started
+        self.planner.record(plan, flops, elapsed)
+        self.logger.debug(f"Plan {plan}: {flops / 1e9:.1f} GFLOPs, {elapsed * 1000:.0f} ms")
+        return SR_image
+
+    async def upscale_x2(self, use_decoration, img_array):
+        plan = self.planner.x2_plan
+        if plan == "native":
+            return await self.upscale_pass(use_decoration, img_array, scale=2)
+        if plan == "approx":
+            img_array = await self._stage("resize", self._halve_input, img_array)
+            return await self.upscale_x4(use_decoration, img_array)
+        SR_image = await self.upscale_x4(use_decoration, img_array)
+        return await self._stage("resize", self._downscale_half, SR_image)
+
+    def max_input_shape(self) -> int:
+        """Максимальная сторона входного изображения: MAX_SHAPE, а при явно включенных
+        тайлах (TILE_SIZE) - MAX_TILED_SHAPE"""
+        if self.tile_size > 0:
+            return max(self.max_shape, int(os.getenv("MAX_TILED_SHAPE", 4096)))
+        return self.max_shape
+
+    @classmethod
+    def check_scale_factor(cls, scale_factor: int):
+        """400 для коэффициента, которого нет среди планов масштабирования: иначе
+        запрос молча выполнился бы как x4, а метки метрик росли бы без ограничений"""
+        if scale_factor not in cls.SCALE_FACTORS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Коэффициент увеличения должен быть одним из: {', '.join(map(str, cls.SCALE_FACTORS))}"
+            )
+
+    @staticmethod
+    def max_output_pixels(scale_factor: int) -> int:
+        """Максимальное число пикселей результата для коэффициента увеличения
+        (MAX_OUTPUT_MPIX_X<k>, иначе общий MAX_OUTPUT_MPIX)"""
+        # 144 Мпикс вмещают 4K (до 4096x2160) при x4; без тайлов вход ограничен MAX_SHAPE и лимит не достигается
+        limit = os.getenv(f"MAX_OUTPUT_MPIX_X{scale_factor}") or os.getenv("MAX_OUTPUT_MPIX", 144)
+        return int(float(limit) * 1_000_000)
+
+    @classmethod
+    def check_output_size(cls, width: int, height: int, scale_factor: int):
+        """400, если результат превысит лимит пикселей: с тайлами вход ограничен
+        только MAX_TILED_SHAPE, и без лимита x8 от 4096x4096 потребовал бы десятки ГБ"""
+        limit = cls.max_output_pixels(scale_factor)
+        if width * height * scale_factor * scale_factor > limit:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Результат x{scale_factor} превысит {limit / 1e6:g} Мпикс, уменьшите изображение или коэффициент"
+            )
+
+    @staticmethod
+    def read_image_size(image_data: bytes) -> tuple[int, int]:
+        """Размеры изображения (ширина, высота) по заголовку, без декодирования пикселей"""
+        try:
+            with Image.open(io.BytesIO(image_data)) as img:
+                return img.size
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Не удалось прочитать изображение"
+            )
+
+    def _decode_image(self, image_data: bytes) -> np.ndarray:
+        image_bytes = io.BytesIO(image_data)
+        image_bytes.seek(0)
+        
+        try:
+            img = Image.open(image_bytes)
+            img = img.convert('RGB')
+            self.logger.debug(f"Image opened: format={img.format}, mode={img.mode}")
+        except Exception as img_error:
+            self.logger.log_error(img_error, "image_opening")
+            raise
+        
+        return np.array(img)
+
+    def _downscale_half(self, SR_image: np.ndarray) -> np.ndarray:
+        import cv2
+
+        downscaled = cv2.resize(SR_image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_LANCZOS4)
+        self.pool.release(SR_image)
+        return downscaled
+
+    def _halve_input(self, img_array: np.ndarray) -> np.ndarray:
+        import cv2
+
+        height, width = img_array.shape[:2]
+        return cv2.resize(img_array, (max(width // 2, 1), max(height // 2, 1)), interpolation=cv2.INTER_AREA)
+
+    def _to_uint8(self, SR_image: np.ndarray) -> np.ndarray:
+        # Повторный проход генератора принимает изображение в uint8;
+        # умножение с приведением типа пишет сразу в uint8-буфер, без float-копии
+        image = self.pool.array(SR_image.shape, np.uint8)
+        np.multiply(SR_image, 255, out=image, casting="unsafe")
+        return image
+
+    def _encode_image(self, SR_image: np.ndarray, encode_options: dict) -> bytes:
+        image = self._to_uint8(SR_image)
+        self.pool.release(SR_image)
+        try:
+            return self.encoder.encode(image, encode_options)
+        finally:
+            self.pool.release(image)
 
     async def upscale_x4(self, use_decoration, img_array):
-        pre_image = await self.preprocessing(img_array)
-            
-        with torch.no_grad():
-            SR_image = self.model(pre_image)
+        return await self.upscale_pass(use_decoration, img_array, scale=4)
 
+    async def upscale_pass(self, use_decoration, img_array, scale: int = 4):
+        """Один проход генератора (x4 или нативный x2) с пре- и постобработкой"""
+        pre_image = await self.preprocessing(img_array)
+        _, _, height, width = pre_image.shape
+        # forward - от постановки в микро-батч до выхода генератора (включая ожидание батча)
+        with _timed_stage("forward"):
+            # Проход, который помещается целиком, быстрее тайлового: тайлы пересчитывают перекрытия
+            if self.tile_size > 0 and max(height, width) > self.max_shape:
+                SR_image = await self.forward_tiled(pre_image, scale)
+            else:
+                SR_image = await self.submit(pre_image, scale)
+        # Вход генератора больше не нужен: буфер возвращается в пул
+        self.pool.release(pre_image)
         SR_image = await self.postprocessing(SR_image, use_decoration)
         return SR_image
 
-    async def postprocessing(self, SR_image, use_decoration: bool = False):
-        SR_image = SR_image.squeeze(0).permute(1, 2, 0).cpu().numpy()
-        SR_image= np.clip(SR_image, -1, 1)
-        SR_image = SR_image * 0.5 + 0.5
+    async def submit(self, pre_image, scale: int = 4):
+        """Прогон генератора через микро-батчинг, с дополнением до канонического размера"""
+        if self.buckets is None:
+            return await self.batcher.submit(pre_image, scale)
+        height, width = pre_image.shape[-2:]
+        output = await self.batcher.submit(self.buckets.pad(pre_image), scale)
+        return self.buckets.crop(output, height, width, scale)
+
+    async def forward_tiled(self, pre_image, scale: int = 4):
+        """Прогон генератора по тайлам с перекрытием и смешиванием швов"""
+        from model_srgan.tiling import TileBlender, TileGrid
+
+        _, channels, height, width = pre_image.shape
+        grid = TileGrid(height, width, self.tile_size, self.tile_overlap)
+        self.logger.debug(f"Tiled inference: {len(grid)} tiles of {self.tile_size}px for {width}x{height}")
+        blender = None
+        # Тайлы отправляются окнами по размеру батча: они объединяются в батчи
+        # (в том числе с тайлами других запросов), а память остается ограниченной
+        window = self.batcher.max_batch_size
+        for start in range(0, len(grid), window):
+            tiles = grid.tiles[start:start + window]
+            crops = [self._tile_input(pre_image, grid, tile) for tile in tiles]
+            outputs = await asyncio.gather(*[self.submit(crop, scale) for crop in crops])
+            for crop in crops:
+                self.pool.release(crop)
+            for tile, tile_output in zip(tiles, outputs):
+                if blender is None:
+                    # Полноразмерный выход выделяется вне event loop: при больших кадрах это сотни МБ
+                    blender = await asyncio.to_thread(TileBlender, grid, tile_output.shape[-1] // tile.width, channels)
+                await asyncio.to_thread(blender.add, tile, tile_output)
+        return blender.result()
+
+    def _tile_input(self, pre_image, grid, tile):
+        import torch
+
+        # Непрерывная копия тайла (channels_last, как и весь вход) в буфер из пула
+        crop = grid.crop(pre_image, tile)
+        buffer = self.pool.tensor(tuple(crop.shape), crop.dtype, crop.device, torch.channels_last)
+        return buffer.copy_(crop)
 
-        SR_image = np.clip(SR_image, 0, 1)
+    async def _run_batch(self, batch, scale: int = 4):
+        return await self.executor.run(self._forward, batch, scale)
 
+    def _forward(self, pre_image, scale: int = 4):
+        import torch
+
+        model = self.model_x2 if scale == 2 else self.model
+        if self.channels_last:
+            pre_image = pre_image.contiguous(memory_format=torch.channels_last)
+        with torch.no_grad():
+            if self.precision == "bf16":
+                with torch.autocast("cpu", dtype=torch.bfloat16):
+                    # Выход (tanh) уже в fp32, приведение только на случай смешанного графа
+                    return model(pre_image).float()
+            return model(pre_image)
+
+    async def postprocessing(self, SR_image, use_decoration: bool = False):
+        # Билатеральный фильтр - отдельная стадия, чтобы его время было видно в метриках
+        SR_image = await self._stage("postprocess", self._postprocess, SR_image)
         if use_decoration:
-            SR_image = cv2.bilateralFilter(SR_image, d=3, sigmaColor=75, sigmaSpace=75)
+            SR_image = await self._stage("decoration", self._decorate, SR_image)
         return SR_image
+
+    def _decorate(self, SR_image: np.ndarray) -> np.ndarray:
+        import cv2
+
+        decorated = cv2.bilateralFilter(SR_image, d=3, sigmaColor=75, sigmaSpace=75)
+        self.pool.release(SR_image)
+        return decorated
+
+    def _postprocess(self, SR_image, use_decoration: bool = False):
+        import torch
+
+        # [-1, 1] -> [0, 1] на месте в выходе генератора; после clamp результат уже в [0, 1]
+        SR_image = SR_image.squeeze(0).clamp_(-1, 1).mul_(0.5).add_(0.5)
+        # Единственная копия: CHW -> HWC сразу в буфер NumPy из пула
+        channels, height, width = SR_image.shape
+        output = self.pool.array((height, width, channels), np.float32)
+        torch.from_numpy(output).copy_(SR_image.permute(1, 2, 0))
+
+        if use_decoration:
+            return self._decorate(output)
+        return output
     
     async def preprocessing(self, low_image):
-        # Преобразуем изображение с помощью albumentations
-        #low_transform = await self.transform.get_lowres_transform(low_image.shape)
-        #preproc_image = low_transform(image=low_image)["image"]
+        return await self._stage("preprocess", self._preprocess, low_image)
 
-        preproc_image = self.transform.original_transform(image=low_image)["image"]
-        # Добавляем batch dimension и перемещаем на устройство (GPU/CPU)
-        preproc_image = preproc_image.unsqueeze(0).to(self.device)
+    def _preprocess(self, low_image):
+        import torch
+        from transform.inference import image_to_tensor
 
-        return preproc_image
+        # Вход генератора 1x3xHxW (channels_last) в буфере из пула, сразу на устройстве
+        height, width, channels = low_image.shape
+        out = self.pool.tensor((1, channels, height, width), torch.float32, self.device, torch.channels_last)
+        return image_to_tensor(low_image, out)
         
+    def stats(self) -> dict:
+        """Статистика конвейера инференса"""
+        return {
+            "backend": self.backend,
+            "precision": self.precision,
+            "batching": self.batcher.stats(),
+            "scale_plans": self.planner.stats(),
+            "buffer_pool": self.pool.stats(),
+        }
+
     def is_ready(self) -> bool:
         """Проверка готовности модели"""
-        return self.ready 
\ No newline at end of file
+        return self.ready 
+
+    def shutdown(self):
+        """Остановка пула инференса"""
+        self.executor.shutdown()
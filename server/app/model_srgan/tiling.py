@@ -0,0 +1,103 @@
+import torch
+from typing import List, NamedTuple
+
+
+class Tile(NamedTuple):
+    y: int
+    x: int
+    height: int
+    width: int
+
+
+def tile_positions(length: int, tile_size: int, overlap: int) -> List[int]:
+    """Начальные координаты тайлов вдоль одной оси (последний тайл прижат к краю)"""
+    if length <= tile_size:
+        return [0]
+    stride = tile_size - overlap
+    positions = list(range(0, length - tile_size, stride))
+    positions.append(length - tile_size)
+    return positions
+
+
+class TileGrid:
+    """Разбиение изображения на тайлы фиксированного размера с перекрытием"""
+
+    def __init__(self, height: int, width: int, tile_size: int, overlap: int):
+        if overlap >= tile_size:
+            raise ValueError("Перекрытие тайлов должно быть меньше размера тайла")
+        self.height = height
+        self.width = width
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.tiles = [
+            Tile(y, x, min(tile_size, height), min(tile_size, width))
+            for y in tile_positions(height, tile_size, overlap)
+            for x in tile_positions(width, tile_size, overlap)
+        ]
+
+    def __iter__(self):
+        return iter(self.tiles)
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def crop(self, image: torch.Tensor, tile: Tile) -> torch.Tensor:
+        """Вырезка тайла из тензора (N, C, H, W)"""
+        return image[:, :, tile.y:tile.y + tile.height, tile.x:tile.x + tile.width]
+
+
+class TileBlender:
+    """Сборка выхода генератора из тайлов с плавным смешиванием швов.
+
+    Каждый тайл умножается на маску, линейно спадающую к границам, которые
+    граничат с соседними тайлами. Маска раскладывается на произведение масок
+    по строкам и столбцам, а сетка тайлов - на произведение позиций по осям,
+    поэтому сумма масок в каждой точке тоже раскладывается на две одномерные
+    суммы: маски нормируются по ним сразу при добавлении тайла, без
+    полноразмерного тензора весов и деления в конце.
+    """
+
+    def __init__(self, grid: TileGrid, scale: int, channels: int = 3):
+        self.grid = grid
+        self.scale = scale
+        self.ramp = grid.overlap * scale
+        self.output = torch.zeros(1, channels, grid.height * scale, grid.width * scale)
+        self.row_weights = self._axis_weights(grid.height, [tile.y for tile in grid if tile.x == 0], grid.tiles[0].height)
+        self.col_weights = self._axis_weights(grid.width, [tile.x for tile in grid if tile.y == 0], grid.tiles[0].width)
+
+    def _ramp(self, length: int, fade_start: bool, fade_end: bool) -> torch.Tensor:
+        mask = torch.ones(length)
+        ramp = min(self.ramp, length // 2)
+        if ramp > 0:
+            fade = (torch.arange(ramp, dtype=torch.float32) + 0.5) / ramp
+            if fade_start:
+                mask[:ramp] = fade
+            if fade_end:
+                mask[-ramp:] = fade.flip(0)
+        return mask
+
+    def _axis_weights(self, length: int, positions: List[int], size: int) -> torch.Tensor:
+        """Сумма одномерных масок всех тайлов вдоль оси (в пикселях выхода)"""
+        weights = torch.zeros(length * self.scale)
+        for position in positions:
+            start, stop = position * self.scale, (position + size) * self.scale
+            weights[start:stop] += self._ramp(stop - start, position > 0, position + size < length)
+        return weights
+
+    def _mask(self, tile: Tile, height: int, width: int) -> torch.Tensor:
+        y, x = tile.y * self.scale, tile.x * self.scale
+        rows = self._ramp(height, tile.y > 0, tile.y + tile.height < self.grid.height) / self.row_weights[y:y + height]
+        cols = self._ramp(width, tile.x > 0, tile.x + tile.width < self.grid.width) / self.col_weights[x:x + width]
+        return (rows[:, None] * cols[None, :])[None, None]
+
+    def add(self, tile: Tile, tile_output: torch.Tensor):
+        """Добавление выхода генератора для тайла (1, C, h*scale, w*scale)"""
+        tile_output = tile_output.float().cpu()
+        _, _, height, width = tile_output.shape
+        mask = self._mask(tile, height, width)
+        y, x = tile.y * self.scale, tile.x * self.scale
+        self.output[:, :, y:y + height, x:x + width].addcmul_(tile_output, mask)
+
+    def result(self) -> torch.Tensor:
+        # Маски уже нормированы: сумма вкладов тайлов и есть результат
+        return self.output
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class JobPublic(BaseModel):
+    id: str
+    status: str
+    progress: float = 0.0
+    scale_factor: int
+    use_decoration: bool
+    output_format: str
+    cost: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
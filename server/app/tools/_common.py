@@ -0,0 +1,43 @@
+"""Общие функции инструментов замеров: чекпоинт, перцентили, память процесса"""
+import argparse
+import os
+import resource
+from typing import Optional
+
+
+def add_checkpoint_argument(parser: argparse.ArgumentParser):
+    parser.add_argument("--checkpoint", default=os.getenv("PATH_TO_MODEL"),
+                        help="Чекпоинт с generator_state_dict (без него - случайные веса)")
+
+
+def checkpoint_or_random(checkpoint: Optional[str], directory: str, upsampling_blocks: int = 2) -> str:
+    """Путь к чекпоинту; если он не задан - чекпоинт со случайными весами генератора в directory.
+
+    На случайных весах генератор выдает почти однотонное изображение: время и
+    память показательны, а PSNR/SSIM и сравнения качества - нет.
+    """
+    if checkpoint:
+        return checkpoint
+    import torch
+    from model_srgan.generator import Generator
+
+    print("Чекпоинт не задан: используются случайные веса, оценки качества не показательны")
+    path = os.path.join(directory, "random.pth")
+    model = Generator(in_channels=3, upsampling_blocks=upsampling_blocks)
+    torch.save({"generator_state_dict": model.state_dict()}, path)
+    return path
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss в Linux - в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
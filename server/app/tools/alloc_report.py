@@ -0,0 +1,120 @@
+"""Аллокации на запрос и рост RSS под длительной нагрузкой.
+
+Через SRGANWrapper.upscale_image_bytes последовательно проходит поток
+изображений нескольких размеров. Каждая конфигурация (пул буферов включен /
+выключен) запускается в свежем процессе. Для одного запроса в установившемся
+режиме считаются аллокации torch (профайлер с profile_memory) и пик памяти
+NumPy/Python (tracemalloc). Запуск из server/app:
+
+    python -m tools.alloc_report --requests 60 --sizes 64,96,128
+"""
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from tools._common import add_checkpoint_argument, checkpoint_or_random, current_rss_mb, peak_rss_mb
+
+
+def make_image(size: int, seed: int) -> bytes:
+    pixels = np.random.default_rng(seed).integers(0, 256, (size, size * 3 // 4, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def run_inline(func, *args):
+    return func(*args)
+
+
+def run_config(env: dict, images: list, scale_factor: int) -> dict:
+    """Замеры в свежем процессе с окружением env"""
+    os.environ.update(env)
+    from torch.profiler import ProfilerActivity, profile
+
+    from model_srgan.srgan_wrapper import SRGANWrapper
+    from utils.inference_executor import InferenceExecutor
+
+    async def run():
+        wrapper = SRGANWrapper(executor=InferenceExecutor(kind="thread", max_workers=1))
+        await wrapper.load_model()
+        # Один проход по всем размерам до замеров: пул и аллокатор в установившемся режиме
+        for image in images[:len(set(images))]:
+            await wrapper.upscale_image_bytes(image, scale_factor)
+
+        rss_start = current_rss_mb()
+        started = time.perf_counter()
+        for image in images:
+            await wrapper.upscale_image_bytes(image, scale_factor)
+        elapsed = time.perf_counter() - started
+        rss_end = current_rss_mb()
+
+        # Профайлер видит только свой поток, поэтому замеряемый запрос выполняется без пула
+        pooled_run = wrapper.executor.run
+        wrapper.executor.run = run_inline
+        with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+            await wrapper.upscale_image_bytes(images[0], scale_factor)
+        wrapper.executor.run = pooled_run
+        allocations = [event.cpu_memory_usage for event in prof.events() if event.cpu_memory_usage > 0]
+
+        tracemalloc.start()
+        await wrapper.upscale_image_bytes(images[0], scale_factor)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        wrapper.shutdown()
+        return {
+            "torch_allocations": len(allocations),
+            "torch_allocated_mb": sum(allocations) / 1024 / 1024,
+            "python_peak_mb": traced_peak / 1024 / 1024,
+            "rss_growth_mb": rss_end - rss_start,
+            "peak_rss_mb": peak_rss_mb(),
+            "ms_per_request": elapsed / len(images) * 1000,
+            "buffer_pool": wrapper.stats().get("buffer_pool"),
+        }
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_checkpoint_argument(parser)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--sizes", default="64,96,128", help="Высоты входных изображений")
+    parser.add_argument("--scale-factor", type=int, default=4)
+    parser.add_argument("--configs", nargs="+", default=["pool", "no-pool"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        args.checkpoint = checkpoint_or_random(args.checkpoint, tmp)
+
+        sizes = [int(size) for size in args.sizes.split(",")]
+        unique = [make_image(size, index) for index, size in enumerate(sizes)]
+        images = [unique[index % len(unique)] for index in range(args.requests)]
+        base = {"PATH_TO_MODEL": args.checkpoint, "WARMUP": "0"}
+        envs = {"pool": {**base, "BUFFER_POOL": "1"}, "no-pool": {**base, "BUFFER_POOL": "0"}}
+
+        print(f"{'config':<8} {'torch allocs':>12} {'torch MB':>9} {'py peak MB':>10} "
+              f"{'RSS growth MB':>13} {'peak RSS MB':>11} {'ms/req':>8}")
+        for name in args.configs:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                result = pool.submit(run_config, envs[name], images, args.scale_factor).result()
+            print(
+                f"{name:<8} {result['torch_allocations']:>12} {result['torch_allocated_mb']:>9.1f} "
+                f"{result['python_peak_mb']:>10.1f} {result['rss_growth_mb']:>13.1f} "
+                f"{result['peak_rss_mb']:>11.1f} {result['ms_per_request']:>8.1f}"
+            )
+            if result["buffer_pool"]:
+                print(f"         buffer_pool: {result['buffer_pool']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Офлайн-бенчмарк конвейера инференса с сравнением с базовой линией.
+
+SRGANWrapper вызывается напрямую (без HTTP и БД) на матрице: изображения
+(demo/ и синтетические) x размеры входа x коэффициенты 2/4/8 x декорирование.
+Для каждого случая - задержка (mean/p50/p95), время стадий, пропускная
+способность (Мпикс выхода в секунду), пиковый RSS, пик памяти NumPy/Python
+(tracemalloc) и аллокации torch за один запрос. Результаты сохраняются в JSON;
+при --baseline случаи, ставшие медленнее порога, помечаются как регрессии
+(код выхода 1). Без чекпоинта используются случайные веса Generator.
+Запуск из server/app:
+
+    python -m tools.benchmark --sizes 64,128 --output bench.json
+    python -m tools.benchmark --sizes 64,128 --baseline bench.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from tools._common import add_checkpoint_argument, checkpoint_or_random, peak_rss_mb
+
+DEMO_DIR = Path(__file__).resolve().parents[3] / "demo"
+
+
+def synthetic_images(size: int) -> dict:
+    """Шум (худший случай для кодирования) и плавный градиент с деталями"""
+    rng = np.random.default_rng(size)
+    noise = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    y, x = np.mgrid[0:size, 0:size] / max(size - 1, 1)
+    gradient = np.stack([x, y, (np.sin(x * 12) * np.cos(y * 12) + 1) / 2], axis=-1)
+    return {"noise": noise, "gradient": (gradient * 255).astype(np.uint8)}
+
+
+def load_images(sources: list, size: int) -> dict:
+    images = {}
+    if "demo" in sources:
+        for path in sorted(DEMO_DIR.glob("orig_*.png")):
+            image = Image.open(path).convert("RGB")
+            side = min(image.size)
+            left, top = (image.width - side) // 2, (image.height - side) // 2
+            crop = image.crop((left, top, left + side, top + side)).resize((size, size), Image.LANCZOS)
+            images[path.stem.removeprefix("orig_")] = np.array(crop)
+    if "synthetic" in sources:
+        images.update(synthetic_images(size))
+
+    encoded = {}
+    for name, pixels in images.items():
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="PNG")
+        encoded[name] = buffer.getvalue()
+    return encoded
+
+
+def case_key(case: dict) -> str:
+    return f"{case['image']}/{case['size']}/x{case['scale']}/{'deco' if case['decoration'] else 'plain'}"
+
+
+async def run_case(wrapper, data: bytes, scale: int, decoration: bool, iterations: int, allocations: bool) -> dict:
+    from utils.profiling import stage_journal
+
+    # Первый прогон формы не учитывается: создание примитивов oneDNN и рост пулов
+    await wrapper.upscale_image_bytes(data, scale, decoration)
+    rss_before = peak_rss_mb()
+
+    latencies = []
+    stages = defaultdict(list)
+    for _ in range(iterations):
+        started = time.perf_counter()
+        with stage_journal() as journal:
+            output = await wrapper.upscale_image_bytes(data, scale, decoration)
+        latencies.append(time.perf_counter() - started)
+        per_stage = defaultdict(float)
+        for stage, _, elapsed in journal:
+            per_stage[stage] += elapsed
+        for stage, elapsed in per_stage.items():
+            stages[stage].append(elapsed)
+
+    width, height = Image.open(io.BytesIO(output)).size
+    ordered = sorted(latencies)
+    result = {
+        "latency_ms": {
+            "mean": statistics.mean(latencies) * 1000,
+            "p50": statistics.median(latencies) * 1000,
+            "p95": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))] * 1000,
+        },
+        "stages_ms": {stage: statistics.mean(values) * 1000 for stage, values in stages.items()},
+        "mpix_per_s": width * height / 1e6 / statistics.median(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": peak_rss_mb() - rss_before,
+    }
+
+    if allocations:
+        from torch.profiler import profile
+        from utils.profiling import profiler_options
+
+        tracemalloc.start()
+        await wrapper.upscale_image_bytes(data, scale, decoration)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with profile(**profiler_options(profile_memory=True)) as prof:
+            await wrapper.upscale_image_bytes(data, scale, decoration)
+        allocated = [event.cpu_memory_usage for event in prof.events() if event.cpu_memory_usage > 0]
+        result.update({
+            "python_peak_mb": traced_peak / 1024 / 1024,
+            "torch_allocations": len(allocated),
+            "torch_allocated_mb": sum(allocated) / 1024 / 1024,
+        })
+    return result
+
+
+def compare(cases: list, baseline: dict, threshold: float, min_ms: float) -> list:
+    """Случаи, медленнее базовой линии больше чем на threshold (и на min_ms в абсолюте)"""
+    previous = {case_key(case): case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in cases:
+        old = previous.get(case_key(case))
+        if old is None:
+            continue
+        new_ms, old_ms = case["latency_ms"]["p50"], old["latency_ms"]["p50"]
+        case["baseline_p50_ms"] = old_ms
+        case["change"] = new_ms / old_ms - 1
+        if case["change"] > threshold and new_ms - old_ms > min_ms:
+            slower_stages = [
+                stage for stage, value in case["stages_ms"].items()
+                if stage in old["stages_ms"] and value > old["stages_ms"][stage] * (1 + threshold)
+                and value - old["stages_ms"][stage] > min_ms
+            ]
+            case["regression"] = True
+            regressions.append((case, slower_stages))
+    return regressions
+
+
+async def run_matrix(args) -> list:
+    from model_srgan.srgan_wrapper import SRGANWrapper
+    from utils.inference_executor import InferenceExecutor
+
+    wrapper = SRGANWrapper(executor=InferenceExecutor(kind="thread", max_workers=args.workers))
+    await wrapper.load_model()
+    if not wrapper.is_ready():
+        raise RuntimeError(f"Модель не загружена: {wrapper.load_error}")
+
+    cases = []
+    try:
+        for size in args.sizes:
+            for image_name, data in load_images(args.images, size).items():
+                for scale in args.scales:
+                    for decoration in args.decoration:
+                        result = await run_case(wrapper, data, scale, decoration, args.iterations, args.allocations)
+                        case = {"image": image_name, "size": size, "scale": scale, "decoration": decoration, **result}
+                        cases.append(case)
+                        print(
+                            f"{case_key(case):<28} p50 {result['latency_ms']['p50']:>9.1f} ms  "
+                            f"{result['mpix_per_s']:>6.2f} Mpx/s  peak RSS {result['peak_rss_mb']:>7.1f} MB  "
+                            + "  ".join(f"{stage} {value:.1f}" for stage, value in result["stages_ms"].items()),
+                            flush=True,
+                        )
+    finally:
+        wrapper.shutdown()
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_checkpoint_argument(parser)
+    parser.add_argument("--sizes", default="64,128", help="Стороны квадратных входов")
+    parser.add_argument("--scales", default="2,4,8")
+    parser.add_argument("--decoration", default="off,on", help="off, on или off,on")
+    parser.add_argument("--images", default="demo,synthetic", help="demo, synthetic или оба")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="Потоки пула инференса")
+    parser.add_argument("--no-allocations", dest="allocations", action="store_false",
+                        help="Не замерять аллокации (tracemalloc и профайлер torch)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="JSON предыдущего запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Допустимое замедление p50 (доля)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Минимальное замедление в мс для регрессии")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    args.scales = [int(scale) for scale in args.scales.split(",")]
+    args.decoration = [value.strip() == "on" for value in args.decoration.split(",")]
+    args.images = [source.strip() for source in args.images.split(",")]
+
+    # Прогрев каждого случая выполняет сам бенчмарк; без тайлов вход ограничен MAX_SHAPE,
+    # с тайлами MAX_SHAPE - порог, выше которого проход идет по тайлам
+    os.environ.setdefault("WARMUP", "0")
+    if not int(os.getenv("TILE_SIZE", 0)):
+        os.environ.setdefault("MAX_SHAPE", str(max(args.sizes) * 2))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["PATH_TO_MODEL"] = checkpoint_or_random(args.checkpoint, tmp)
+        cases = asyncio.run(run_matrix(args))
+
+    import torch
+
+    results = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "torch": torch.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "iterations": args.iterations,
+            "env": {name: os.getenv(name) for name in (
+                "INFERENCE_BACKEND", "INFERENCE_PRECISION", "OPTIMIZE_MODEL", "TILE_SIZE", "BUFFER_POOL", "SHAPE_BUCKETS"
+            ) if os.getenv(name) is not None},
+        },
+        "cases": cases,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(cases, json.load(f), args.threshold, args.min_ms)
+        print(f"\nСравнение с {args.baseline} (порог {args.threshold:.0%}):")
+        for case in cases:
+            if "change" in case:
+                flag = "REGRESSION" if case.get("regression") else "ok"
+                print(f"  {case_key(case):<28} {case['baseline_p50_ms']:>9.1f} -> {case['latency_ms']['p50']:>9.1f} ms "
+                      f"({case['change']:+.1%}) {flag}")
+        for case, stages in regressions:
+            print(f"  {case_key(case)}: медленнее стадии {', '.join(stages) or '-'}")
+        results["meta"]["baseline"] = args.baseline
+        results["meta"]["regressions"] = len(regressions)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nРезультаты: {args.output}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
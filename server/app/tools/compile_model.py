@@ -0,0 +1,39 @@
+"""Сборка артефакта генератора для инференса из обучающего чекпоинта.
+
+Артефакт содержит только веса генератора со свернутым BatchNorm и
+загружается сервером через memory mapping (MODEL_ARTIFACT / MODEL_ARTIFACT_X2).
+Запуск из server/app:
+
+    python -m tools.compile_model --checkpoint path/to/srgan.pth --output models/generator_x4.pt
+"""
+import argparse
+import os
+import time
+
+from model_srgan.artifact import compile_artifact, load_artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoint", default=os.getenv("PATH_TO_MODEL"), help="Чекпоинт с generator_state_dict")
+    parser.add_argument("--output", required=True, help="Путь артефакта")
+    parser.add_argument("--upsampling-blocks", type=int, default=2, help="2 - генератор x4, 1 - x2")
+    args = parser.parse_args()
+    if not args.checkpoint:
+        parser.error("не задан --checkpoint (или PATH_TO_MODEL)")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    report = compile_artifact(args.checkpoint, args.output, args.upsampling_blocks)
+
+    started = time.perf_counter()
+    load_artifact(args.output)
+    print(
+        f"{args.output}: {os.path.getsize(args.output) / 1024 / 1024:.1f} MB "
+        f"(чекпоинт {os.path.getsize(args.checkpoint) / 1024 / 1024:.1f} MB), "
+        f"{report['parameters']} параметров, свернуто BatchNorm: {report['folded_batchnorm']}, "
+        f"загрузка {time.perf_counter() - started:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Хвостовые задержки первых запросов: без прогрева, с прогревом и с SHAPE_BUCKETS.
+
+Каждая конфигурация запускается в свежем процессе (холодный старт), после
+чего через SRGANWrapper.upscale_image_bytes последовательно проходят
+изображения случайных размеров. Запуск из server/app:
+
+    python -m tools.latency_report --requests 30 --buckets 64,96,128,160
+"""
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from tools._common import add_checkpoint_argument, checkpoint_or_random, percentile
+
+
+def make_images(count: int, min_size: int, max_size: int, seed: int) -> list:
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        height, width = rng.randint(min_size, max_size), rng.randint(min_size, max_size)
+        pixels = np.random.default_rng(rng.randint(0, 2 ** 31)).integers(0, 256, (height, width, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def run_config(env: dict, images: list, scale_factor: int) -> list:
+    """Задержки запросов в свежем процессе с окружением env"""
+    os.environ.update(env)
+    from model_srgan.srgan_wrapper import SRGANWrapper
+    from utils.inference_executor import InferenceExecutor
+
+    async def run():
+        wrapper = SRGANWrapper(executor=InferenceExecutor(kind="thread"))
+        await wrapper.load_model()
+        latencies = []
+        for image in images:
+            started = time.perf_counter()
+            await wrapper.upscale_image_bytes(image, scale_factor)
+            latencies.append(time.perf_counter() - started)
+        wrapper.shutdown()
+        return latencies
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_checkpoint_argument(parser)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--min-size", type=int, default=48)
+    parser.add_argument("--max-size", type=int, default=160)
+    parser.add_argument("--scale-factor", type=int, default=4)
+    parser.add_argument("--buckets", default=os.getenv("SHAPE_BUCKETS") or "64,96,128,160")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        args.checkpoint = checkpoint_or_random(args.checkpoint, tmp)
+
+        images = make_images(args.requests, args.min_size, args.max_size, args.seed)
+        base = {"PATH_TO_MODEL": args.checkpoint, "MAX_SHAPE": str(args.max_size)}
+        configs = {
+            "cold": {**base, "WARMUP": "0", "SHAPE_BUCKETS": ""},
+            "warmup": {**base, "WARMUP": "1", "SHAPE_BUCKETS": ""},
+            "warmup+buckets": {**base, "WARMUP": "1", "SHAPE_BUCKETS": args.buckets},
+        }
+
+        print(f"{'config':<16} {'first, ms':>10} {'mean, ms':>9} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9}")
+        for name, env in configs.items():
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                latencies = pool.submit(run_config, env, images, args.scale_factor).result()
+            print(
+                f"{name:<16} {latencies[0] * 1000:>10.1f} {statistics.mean(latencies) * 1000:>9.1f} "
+                f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.95) * 1000:>9.1f} "
+                f"{percentile(latencies, 0.99) * 1000:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Нагрузочный тест FastAPI-приложения с локальными SQLite и заглушкой Stripe.
+
+Приложение поднимается в этом же процессе поверх SQLite (aiosqlite) во
+временном каталоге, вместо Stripe подставляется заглушка в памяти. Несколько
+асинхронных клиентов (каждый - свой пользователь) в течение заданного времени
+отправляют запросы по взвешенной смеси /token, /users/me, /upscale (и, по
+желанию, /products и пополнение баланса через checkout). Для каждой конечной
+точки выводятся RPS, перцентили задержки и доля ошибок. По умолчанию запросы
+идут через ASGI-транспорт httpx, с --serve - по HTTP через uvicorn.
+Запуск из server/app:
+
+    python -m tools.load_test --clients 8 --duration 60 --mix token=1,me=4,upscale=2
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from tools._common import add_checkpoint_argument, checkpoint_or_random, percentile
+
+DEMO_IMAGE = Path(__file__).resolve().parents[3] / "demo" / "orig_flower.png"
+PASSWORD = "load-test-password"
+
+
+class StripeObject(dict):
+    """Ответ заглушки Stripe: словарь с доступом к полям через атрибуты, как у stripe.StripeObject"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class StripeStub:
+    """Заглушка модуля stripe для маршрутов оплаты: продукты, checkout-сессии и StripeError"""
+
+    class error:
+        class StripeError(Exception):
+            pass
+
+    def __init__(self, amount: int = 100):
+        price = StripeObject(id="price_load_test", unit_amount=100, currency="usd")
+        self.products = {
+            "prod_load_test": StripeObject(
+                id="prod_load_test", name="Load test credits", active=True,
+                default_price=price, metadata={"amount": str(amount)},
+            )
+        }
+        self.sessions = {}
+        self.Product = self._ProductApi(self)
+        self.checkout = StripeObject(Session=self._SessionApi(self))
+
+    class _ProductApi:
+        def __init__(self, stub):
+            self.stub = stub
+
+        def list(self, **params):
+            return StripeObject(data=list(self.stub.products.values()))
+
+        def retrieve(self, product_id):
+            if product_id not in self.stub.products:
+                raise StripeStub.error.StripeError(f"No such product: {product_id}")
+            return self.stub.products[product_id]
+
+    class _SessionApi:
+        def __init__(self, stub):
+            self.stub = stub
+
+        def create(self, **params):
+            session_id = f"cs_load_test_{len(self.stub.sessions)}"
+            # Оплата в заглушке проходит сразу
+            session = StripeObject(id=session_id, url=f"https://checkout.invalid/{session_id}", payment_status="paid")
+            self.stub.sessions[session_id] = session
+            return session
+
+        def retrieve(self, session_id):
+            if session_id not in self.stub.sessions:
+                raise StripeStub.error.StripeError(f"No such checkout session: {session_id}")
+            return self.stub.sessions[session_id]
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, weight = item.partition("=")
+        mix[name] = float(weight or 1)
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}; доступны: {', '.join(SCENARIOS)}")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def make_image(base: np.ndarray, rng: random.Random) -> bytes:
+    """Уникальное изображение: иначе повторы отдаются из кэша результатов без инференса"""
+    pixels = base.copy()
+    pixels[rng.randrange(pixels.shape[0]), rng.randrange(pixels.shape[1])] = [rng.randrange(256) for _ in range(3)]
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Client:
+    """Клиент нагрузочного теста: свой пользователь и токен"""
+
+    def __init__(self, http, email: str, args, rng: random.Random, base_image: np.ndarray, record):
+        self.http = http
+        self.email = email
+        self.args = args
+        self.rng = rng
+        self.base_image = base_image
+        self.record = record
+        self.token = None
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def call(self, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, **kwargs)
+            status_code = response.status_code
+        except Exception as e:
+            response, status_code = None, type(e).__name__
+        self.record(endpoint, status_code, time.perf_counter() - started)
+        return response
+
+    async def login(self):
+        response = await self.call("/token", "POST", "/token", data={"username": self.email, "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["access_token"]
+
+    async def users_me(self):
+        await self.call("/users/me", "GET", "/users/me", headers=self.headers)
+
+    async def upscale(self):
+        data = {
+            "scale_factor": str(self.rng.choice(self.args.scales)),
+            "use_decoration": str(self.rng.random() < self.args.decoration).lower(),
+        }
+        files = {"file": ("image.png", make_image(self.base_image, self.rng), "image/png")}
+        headers = {**self.headers, **({"Accept": "image/png"} if self.args.binary else {})}
+        await self.call("/upscale", "POST", "/upscale", files=files, data=data, headers=headers)
+
+    async def products(self):
+        await self.call("/products", "GET", "/products")
+
+    async def topup(self):
+        response = await self.call(
+            "/create-checkout-session", "POST", "/create-checkout-session",
+            params={"price_id": "price_load_test"}, headers=self.headers,
+        )
+        if response is not None and response.status_code == 200:
+            await self.call(
+                "/payment-success", "GET", "/payment-success",
+                params={"session_id": response.json()["session_id"], "product_id": "prod_load_test"},
+                headers=self.headers,
+            )
+
+    async def run(self, mix: dict, deadline: float):
+        await self.login()
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            scenario = self.rng.choices(names, weights)[0]
+            if scenario != "token" and self.token is None:
+                scenario = "token"
+            await getattr(self, SCENARIOS[scenario])()
+            if self.args.think_ms:
+                await asyncio.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+
+
+SCENARIOS = {"token": "login", "me": "users_me", "upscale": "upscale", "products": "products", "topup": "topup"}
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    report = {}
+    for endpoint, items in sorted(samples.items()):
+        latencies = [latency for _, latency in items]
+        statuses = Counter(str(status_code) for status_code, _ in items)
+        errors = sum(count for status_code, count in statuses.items() if not status_code.startswith("2"))
+        report[endpoint] = {
+            "requests": len(items),
+            "rps": len(items) / elapsed,
+            "mean_ms": statistics.mean(latencies) * 1000,
+            "p50_ms": percentile(latencies, 0.5) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "error_rate": errors / len(items),
+            "statuses": dict(statuses),
+        }
+    return report
+
+
+async def prepare_users(fastapi_app, http, count: int, money: int) -> list:
+    from db.model_db import User
+    from sqlalchemy import update
+
+    emails = [f"load{index}@example.com" for index in range(count)]
+    for email in emails:
+        response = await http.post("/register", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+    async with fastapi_app.db_manager.get_db() as db:
+        await db.execute(update(User).values(money=money))
+    return emails
+
+
+async def wait_ready(http, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        response = await http.get("/readyz")
+        if response.status_code == 200:
+            return
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Приложение не готово за {timeout:.0f} с: {response.json()}")
+
+
+async def run_load(args) -> dict:
+    import httpx
+    from app import FastAPIApp
+
+    fastapi_app = FastAPIApp()
+    stripe = StripeStub()
+    # cached_property: заглушка подставляется вместо ленивого импорта stripe
+    fastapi_app.__dict__["stripe"] = stripe
+
+    server = server_task = None
+    if args.serve:
+        import uvicorn
+
+        server = uvicorn.Server(uvicorn.Config(fastapi_app.app, host="127.0.0.1", port=args.port, log_level="warning"))
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            if server_task.done():
+                server_task.result()
+            await asyncio.sleep(0.05)
+        transport, base_url = None, f"http://127.0.0.1:{args.port}"
+    else:
+        # Без сервера события startup вызываются вручную, как это сделал бы uvicorn
+        await fastapi_app.app.router.startup()
+        transport, base_url = httpx.ASGITransport(app=fastapi_app.app), "http://load-test"
+
+    limits = httpx.Limits(max_connections=args.clients * 2)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as http:
+        try:
+            await wait_ready(http, args.ready_timeout)
+            emails = await prepare_users(fastapi_app, http, args.clients, args.money)
+
+            base_image = np.array(Image.open(DEMO_IMAGE).convert("RGB").resize((args.image_size, args.image_size)))
+            samples = defaultdict(list)
+            record = lambda endpoint, status_code, latency: samples[endpoint].append((status_code, latency))
+            clients = [
+                Client(http, email, args, random.Random(args.seed + index), base_image, record)
+                for index, email in enumerate(emails)
+            ]
+            print(f"Нагрузка: {args.clients} клиентов, {args.duration:.0f} с, смесь {args.mix}", flush=True)
+            started = time.perf_counter()
+            await asyncio.gather(*[client.run(args.mix, started + args.duration) for client in clients])
+            elapsed = time.perf_counter() - started
+            stats = (await http.get("/stats")).json()["stats"]
+        finally:
+            if server is not None:
+                server.should_exit = True
+                await server_task
+            else:
+                await fastapi_app.app.router.shutdown()
+
+    return {
+        "elapsed_s": elapsed,
+        "endpoints": summarize(samples, elapsed),
+        "server_stats": {name: stats.get(name) for name in ("admission", "batching", "result_cache", "uploads")},
+        "stripe_sessions": len(stripe.sessions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_checkpoint_argument(parser)
+    parser.add_argument("--clients", type=int, default=8, help="Одновременные клиенты (и пользователи)")
+    parser.add_argument("--duration", type=float, default=30, help="Длительность нагрузки, с")
+    parser.add_argument("--mix", default="token=1,me=4,upscale=2",
+                        help=f"Веса сценариев: {', '.join(SCENARIOS)}")
+    parser.add_argument("--scales", default="2,4", help="Коэффициенты увеличения для /upscale")
+    parser.add_argument("--decoration", type=float, default=0.2, help="Доля /upscale с декорированием")
+    parser.add_argument("--image-size", type=int, default=64, help="Сторона входного изображения")
+    parser.add_argument("--binary", action="store_true", help="Бинарный ответ /upscale (Accept: image/png) вместо JSON")
+    parser.add_argument("--think-ms", type=float, default=0, help="Средняя пауза клиента между запросами, мс")
+    parser.add_argument("--money", type=int, default=1_000_000, help="Начальный баланс пользователей")
+    parser.add_argument("--serve", action="store_true", help="Запросы по HTTP через uvicorn вместо ASGI-транспорта")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300, help="Таймаут запроса, с")
+    parser.add_argument("--ready-timeout", type=float, default=600, help="Ожидание загрузки модели, с")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Сохранить отчет в JSON")
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+    args.scales = [int(scale) for scale in args.scales.split(",")]
+
+    tmp = tempfile.mkdtemp(prefix="srgan-load-")
+    try:
+        # Окружение задается до импорта приложения: настройки БД читаются при импорте
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tmp, 'load_test.db')}"
+        os.environ["JOB_RESULTS_DIR"] = os.path.join(tmp, "job_results")
+        os.environ.setdefault("STRIPE_PUBLIC_KEY", "pk_load_test")
+        os.environ["PATH_TO_MODEL"] = checkpoint_or_random(args.checkpoint, tmp)
+
+        report = asyncio.run(run_load(args))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{'endpoint':<26} {'requests':>8} {'RPS':>7} {'mean ms':>9} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'p99 ms':>9} {'errors':>7}  statuses")
+    for endpoint, row in report["endpoints"].items():
+        print(
+            f"{endpoint:<26} {row['requests']:>8} {row['rps']:>7.2f} {row['mean_ms']:>9.1f} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate']:>7.1%}  {row['statuses']}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": {**vars(args), "checkpoint": args.checkpoint}, **report}, f, indent=2, ensure_ascii=False)
+        print(f"\nОтчет: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
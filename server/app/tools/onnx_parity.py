@@ -0,0 +1,73 @@
+"""Проверка совпадения ONNX Runtime-бэкенда с eager-генератором.
+
+Генератор экспортируется в ONNX и прогоняется на случайных входах разных
+форм (динамические оси) и на оригиналах из demo/. Код возврата 1, если
+расхождение превышает допуск. Запуск из server/app:
+
+    python -m tools.onnx_parity --checkpoint path/to/srgan.pth
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+
+from model_srgan.backends import OnnxGenerator, export_onnx
+from model_srgan.generator import Generator
+from tools._common import add_checkpoint_argument, checkpoint_or_random
+
+DEMO_DIR = Path(__file__).resolve().parents[3] / "demo"
+RANDOM_SHAPES = [(1, 3, 32, 48), (2, 3, 64, 64), (1, 3, 97, 131)]
+
+
+def timed(forward, sample) -> tuple[np.ndarray, float]:
+    forward(sample)
+    started = time.perf_counter()
+    output = forward(sample)
+    return output.numpy(), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_checkpoint_argument(parser)
+    parser.add_argument("--upsampling-blocks", type=int, default=2, help="2 - генератор x4, 1 - x2")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("ORT_INTRA_OP_THREADS", 0)))
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    samples = [(f"random {shape}", torch.rand(*shape)) for shape in RANDOM_SHAPES]
+    for path in sorted(glob.glob(str(DEMO_DIR / "orig_*"))):
+        image = np.array(Image.open(path).convert("RGB"))
+        samples.append((Path(path).name, torch.from_numpy(image).permute(2, 0, 1).unsqueeze(0).float() / 255))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = checkpoint_or_random(args.checkpoint, tmp, args.upsampling_blocks)
+        model = Generator(in_channels=3, upsampling_blocks=args.upsampling_blocks).eval()
+        model.load_state_dict(torch.load(checkpoint, map_location="cpu")["generator_state_dict"])
+
+        path = os.path.join(tmp, "generator.onnx")
+        export_onnx(model, path)
+        onnx_model = OnnxGenerator(path, args.threads)
+
+        failed = False
+        print(f"{'input':<28} {'max diff':>10} {'eager, ms':>10} {'onnx, ms':>10}")
+        with torch.no_grad():
+            for name, sample in samples:
+                expected, eager_time = timed(model, sample)
+                output, onnx_time = timed(onnx_model, sample)
+                max_diff = float(np.abs(expected - output).max())
+                failed = failed or max_diff > args.tolerance
+                print(f"{name:<28} {max_diff:>10.2e} {eager_time * 1000:>10.1f} {onnx_time * 1000:>10.1f}")
+
+    print("FAIL" if failed else "OK", f"(допуск {args.tolerance:.0e})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
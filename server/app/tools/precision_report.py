@@ -0,0 +1,96 @@
+"""Отклонение режимов пониженной точности от fp32 (PSNR/SSIM) на оригиналах из demo/.
+
+Каждый режим собирается так же, как при старте сервера (INFERENCE_PRECISION),
+в отдельном процессе (чтобы честно измерить пиковую память) и сравнивается
+с fp32-результатом того же чекпоинта. Запуск из server/app:
+
+    python -m tools.precision_report --checkpoint path/to/srgan.pth --modes int8 bf16
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from model_srgan.quantization import psnr, ssim
+from model_srgan.srgan_wrapper import SRGANWrapper
+from tools._common import add_checkpoint_argument, checkpoint_or_random, current_rss_mb, peak_rss_mb
+from utils.inference_executor import InferenceExecutor
+
+DEMO_DIR = Path(__file__).resolve().parents[3] / "demo"
+
+
+def build_wrapper(precision: str) -> SRGANWrapper:
+    wrapper = SRGANWrapper(executor=InferenceExecutor(kind="thread", max_workers=1))
+    wrapper.precision = precision
+    wrapper._load_weights()
+    return wrapper
+
+
+def run_mode(precision: str, image_paths: list) -> dict:
+    """Прогон изображений в режиме precision (выполняется в отдельном процессе)"""
+    wrapper = build_wrapper(precision)
+    result = {"precision": wrapper.precision, "images": {}}
+    if wrapper.precision != precision:
+        return result
+
+    # Пик памяти считается от RSS после загрузки модели
+    baseline = current_rss_mb()
+    for path in image_paths:
+        pre_image = wrapper._preprocess(np.array(Image.open(path).convert("RGB")))
+        # Первый проход прогревает аллокатор и примитивы oneDNN
+        wrapper._forward(pre_image, 4)
+        started = time.perf_counter()
+        output = wrapper._forward(pre_image, 4)
+        elapsed = time.perf_counter() - started
+        result["images"][Path(path).name] = (wrapper._postprocess(output), elapsed)
+    result["peak_mb"] = peak_rss_mb() - baseline
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_checkpoint_argument(parser)
+    parser.add_argument("--calibration", default=os.getenv("QUANT_CALIBRATION_DIR", str(DEMO_DIR)),
+                        help="Каталог калибровки для int8")
+    parser.add_argument("--images", nargs="*", default=sorted(glob.glob(str(DEMO_DIR / "orig_*"))))
+    parser.add_argument("--modes", nargs="+", default=["int8", "bf16"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["PATH_TO_MODEL"] = checkpoint_or_random(args.checkpoint, tmp)
+        os.environ["QUANT_CALIBRATION_DIR"] = args.calibration
+
+        results = {}
+        for mode in ["fp32", *args.modes]:
+            # Свежий процесс на режим: пиковый RSS не наследуется от предыдущих
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results[mode] = pool.submit(run_mode, mode, args.images).result()
+
+        reference = results["fp32"]
+        print(f"{'image':<20} {'mode':<6} {'PSNR, dB':>9} {'SSIM':>7} {'ms':>8} {'fp32, ms':>9}")
+        for mode in args.modes:
+            result = results[mode]
+            if result["precision"] != mode:
+                print(f"Режим {mode} недоступен, подробности в логе сервера")
+                continue
+            for name, (output, elapsed) in result["images"].items():
+                expected, reference_time = reference["images"][name]
+                print(
+                    f"{name:<20} {mode:<6} {psnr(expected, output):>9.2f} {ssim(expected, output):>7.4f} "
+                    f"{elapsed * 1000:>8.1f} {reference_time * 1000:>9.1f}"
+                )
+        print("\nПиковый прирост RSS за прогон изображений, МБ:")
+        for mode, result in results.items():
+            if "peak_mb" in result:
+                print(f"  {mode:<6} {result['peak_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
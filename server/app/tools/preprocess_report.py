@@ -0,0 +1,78 @@
+"""Предобработка входа генератора: albumentations против transform.inference.
+
+Для каждого размера сравнивается время преобразования uint8 HWC -> float32
+1x3xHxW тремя способами (Transforms.original_transform, image_to_tensor с
+новым тензором и с переиспользуемым выходным буфером), а также время импорта
+модулей предобработки в свежем интерпретаторе (torch импортируется заранее,
+он нужен в любом случае). Запуск из server/app:
+
+    python -m tools.preprocess_report --sizes 128,512,1024 --repeats 20
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+IMPORT_SNIPPET = (
+    "import time, torch; started = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def import_time(module: str, repeats: int) -> float:
+    """Медиана времени импорта модуля (после torch) в свежих процессах, с"""
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def measure(func, repeats: int) -> float:
+    """Медиана времени вызова, мс"""
+    func()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="128,512,1024", help="Стороны квадратных входов")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--import-repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    import torch
+    from transform.inference import image_to_tensor
+    from transform.transform import Transforms
+
+    albumentations_transform = Transforms().original_transform
+
+    print(f"{'size':>6} {'albumentations, ms':>19} {'from_numpy, ms':>15} {'pooled, ms':>11} {'max diff':>9}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        image = np.random.default_rng(size).integers(0, 256, (size, size, 3), dtype=np.uint8)
+        out = torch.empty((1, 3, size, size), memory_format=torch.channels_last)
+        reference = albumentations_transform(image=image)["image"].unsqueeze(0)
+        diff = (image_to_tensor(image) - reference).abs().max().item()
+        old_ms = measure(lambda: albumentations_transform(image=image)["image"].unsqueeze(0), args.repeats)
+        new_ms = measure(lambda: image_to_tensor(image), args.repeats)
+        pooled_ms = measure(lambda: image_to_tensor(image, out), args.repeats)
+        print(f"{size:>6} {old_ms:>19.2f} {new_ms:>15.2f} {pooled_ms:>11.2f} {diff:>9.1e}")
+
+    print()
+    for module in ("transform.transform", "transform.inference"):
+        print(f"import {module:<20} {import_time(module, args.import_repeats) * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
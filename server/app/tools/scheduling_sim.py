@@ -0,0 +1,98 @@
+"""Сравнение политик очереди допуска (fifo / sjf) на смешанной нагрузке.
+
+Запросы проходят через настоящий AdmissionController, а "инференс" заменен
+ожиданием, пропорциональным оценке стоимости. Параметры по умолчанию
+соответствуют серверу: мелкий запрос 200x200 x4 (~177 GFLOPs), крупный
+1000x1000 x8 (~22 000 GFLOPs), ~70 GFLOP/s на одном ядре и период старения
+SCHEDULER_AGING_HALF_LIFE_S. Время симуляции ускорено в --speedup раз,
+задержки выводятся в реальном масштабе. Запуск из server/app:
+
+    python -m tools.scheduling_sim --requests 300 --large-share 0.04
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from tools._common import percentile
+from utils.admission import AdmissionController, RequestCost
+from utils.scheduler import SchedulingQueue
+
+
+def make_workload(args):
+    """Поток запросов: (момент поступления, стоимость в GFLOPs)"""
+    rng = random.Random(args.seed)
+    mean_cost = (1 - args.large_share) * args.small_gflops + args.large_share * args.large_gflops
+    # Интенсивность поступления подобрана под заданную загрузку сервера
+    rate = args.load * args.gflops_per_s / mean_cost
+    arrival = 0.0
+    workload = []
+    for _ in range(args.requests):
+        arrival += rng.expovariate(rate)
+        cost = args.large_gflops if rng.random() < args.large_share else args.small_gflops
+        workload.append((arrival, cost))
+    return workload
+
+
+async def run_policy(policy, workload, args):
+    # Каждый запрос занимает весь бюджет памяти: одновременно выполняется один
+    # запрос, очередь допуска работает как единственный сервер (M/G/1)
+    controller = AdmissionController(
+        lambda height, width, scale: 0.0,
+        gflops_budget=max(gflops for _, gflops in workload),
+        memory_budget_mb=1,
+        max_queue=len(workload),
+        max_wait=float("inf"),
+    )
+    controller._waiters = SchedulingQueue(policy, args.half_life / args.speedup)
+    latencies = []
+
+    async def request(arrival, gflops):
+        await asyncio.sleep(max(0.0, arrival / args.speedup - (time.perf_counter() - started)))
+        submitted = time.perf_counter()
+        async with controller.admit(RequestCost(gflops, controller.memory_budget), can_reject=False):
+            await asyncio.sleep(gflops / args.gflops_per_s / args.speedup)
+        latencies.append((gflops, (time.perf_counter() - submitted) * args.speedup))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(arrival, gflops) for arrival, gflops in workload))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--small-gflops", type=float, default=177.0, help="200x200 x4")
+    parser.add_argument("--large-gflops", type=float, default=22000.0, help="1000x1000 x8")
+    parser.add_argument("--large-share", type=float, default=0.04)
+    parser.add_argument("--gflops-per-s", type=float, default=70.0, help="Производительность имитируемого сервера")
+    parser.add_argument("--load", type=float, default=0.85, help="Доля занятости сервера")
+    parser.add_argument(
+        "--half-life", type=float, default=float(os.getenv("SCHEDULER_AGING_HALF_LIFE_S", 60)),
+        help="SCHEDULER_AGING_HALF_LIFE_S"
+    )
+    parser.add_argument("--speedup", type=float, default=200.0, help="Во сколько раз ускорено время симуляции")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workload = make_workload(args)
+    print(
+        f"{'policy':<6} {'mean, s':>9} {'p95, s':>9} {'p99, s':>9} {'max, s':>9} "
+        f"{'small p99':>10} {'large max':>10}"
+    )
+    for policy in SchedulingQueue.POLICIES:
+        results = asyncio.run(run_policy(policy, workload, args))
+        latencies = [latency for _, latency in results]
+        small = [latency for gflops, latency in results if gflops < args.large_gflops]
+        large = [latency for gflops, latency in results if gflops >= args.large_gflops]
+        print(
+            f"{policy:<6} {statistics.mean(latencies):>9.1f} {percentile(latencies, 0.95):>9.1f} "
+            f"{percentile(latencies, 0.99):>9.1f} {max(latencies):>9.1f} "
+            f"{percentile(small, 0.99) if small else 0:>10.1f} {max(large) if large else 0:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import numpy as np
+import torch
+
+
+def image_to_tensor(image: np.ndarray, out: torch.Tensor = None, device="cpu") -> torch.Tensor:
+    """Изображение uint8 (H, W, C) -> тензор float32 (1, C, H, W) в [0, 1] для генератора.
+
+    Результат совпадает с Transforms.original_transform (Normalize(0, 1) +
+    ToTensorV2) с добавленной batch-размерностью, но без albumentations и
+    промежуточных копий: буфер NumPy оборачивается через torch.from_numpy,
+    а перестановка осей HWC -> CHW - это представление с раскладкой
+    channels_last, поэтому приведение типа и деление на 255 выполняются
+    одним проходом сразу в выходной тензор (channels_last, как ждет oneDNN).
+    """
+    # ascontiguousarray копирует только вход с отрицательными шагами или разрывами
+    view = torch.from_numpy(np.ascontiguousarray(image)).permute(2, 0, 1).unsqueeze(0)
+    if out is None:
+        out = torch.empty(view.shape, dtype=torch.float32, device=device, memory_format=torch.channels_last)
+    if out.device != view.device:
+        # На GPU передается uint8 - вчетверо меньше данных, чем float32
+        view = view.to(out.device)
+    return torch.div(view, 255, out=out)
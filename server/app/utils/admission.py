@@ -0,0 +1,205 @@
+import asyncio
+import math
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+
+from utils.scheduler import SchedulingQueue
+
+# Грубая оценка пиковой памяти на пиксель результата: выход генератора во float32,
+# копии при постобработке и uint8-буфер для кодирования
+BYTES_PER_OUTPUT_PIXEL = 3 * 4 * 4
+DECORATION_COST_FACTOR = 1.1
+
+
+class RequestCost(NamedTuple):
+    gflops: float
+    memory: int
+
+
+class AdmissionSlot:
+    """Выданный допуск. Если вычисление продолжается после выхода запроса
+    (общая задача SingleFlight, клиент отключился), бюджет удерживается до ее завершения"""
+
+    def __init__(self, cost: RequestCost):
+        self.cost = cost
+        self.task: Optional[asyncio.Future] = None
+
+    def hold_until(self, task: asyncio.Future):
+        self.task = task
+
+
+class AdmissionController:
+    """Контроль допуска запросов к инференсу по бюджету вычислений и памяти.
+
+    Стоимость запроса оценивается по размерам изображения и коэффициенту
+    увеличения. Запрос дороже всего бюджета не выполнится никогда и сразу
+    отклоняется с 413. Пока суммарная стоимость выполняющихся запросов
+    укладывается в бюджет, запрос допускается сразу; иначе ждет в очереди, а
+    если очередь полна или ожидание слишком долгое - отклоняется с 429 и
+    Retry-After. Порядок допуска ожидающих задается политикой SchedulingQueue.
+
+    Бюджеты, не заданные явно, расширяются до самого большого запроса, который
+    пропускают лимиты загрузки и результата (fit_largest). Производительность
+    для оценки ожидания берется из замера при загрузке модели (calibrate),
+    если ADMISSION_INITIAL_GFLOPS_PER_S не задана явно.
+    """
+
+    def __init__(
+        self,
+        estimate_flops: Callable[[int, int, int], float],
+        gflops_budget: Optional[float] = None,
+        memory_budget_mb: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ):
+        self.estimate_flops = estimate_flops
+        self.gflops_budget = gflops_budget or float(os.getenv("ADMISSION_GFLOPS_BUDGET", 25000))
+        self.memory_budget = (memory_budget_mb or int(os.getenv("ADMISSION_MEMORY_BUDGET_MB", 4096))) * 1024 * 1024
+        self.gflops_budget_pinned = bool(gflops_budget or os.getenv("ADMISSION_GFLOPS_BUDGET"))
+        self.memory_budget_pinned = bool(memory_budget_mb or os.getenv("ADMISSION_MEMORY_BUDGET_MB"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ADMISSION_MAX_QUEUE", 32))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("ADMISSION_MAX_WAIT_S", 30))
+        # Наблюдаемая производительность (GFLOP/s), сглаженная экспоненциально;
+        # до замера при загрузке модели - консервативная оценка для одного ядра
+        self.throughput_pinned = os.getenv("ADMISSION_INITIAL_GFLOPS_PER_S") is not None
+        self.throughput = float(os.getenv("ADMISSION_INITIAL_GFLOPS_PER_S", 50))
+
+        self.in_flight = 0
+        self.used_gflops = 0.0
+        self.used_memory = 0
+        self._waiters = SchedulingQueue()
+        self.counters = Counter()
+
+    def estimate(self, height: int, width: int, scale_factor: int, use_decoration: bool) -> RequestCost:
+        gflops = self.estimate_flops(height, width, scale_factor) / 1e9
+        if use_decoration:
+            gflops *= DECORATION_COST_FACTOR
+        output_pixels = height * width * scale_factor * scale_factor
+        return RequestCost(gflops, output_pixels * BYTES_PER_OUTPUT_PIXEL)
+
+    def calibrate(self, gflops_per_s: float):
+        """Начальная производительность по замеру генератора на этой машине"""
+        if gflops_per_s > 0 and not self.throughput_pinned:
+            self.throughput = gflops_per_s
+
+    def fit_largest(self, costs):
+        """Бюджеты по умолчанию расширяются до самого большого допустимого запроса:
+        иначе запрос, прошедший лимиты размера, всегда получал бы 413"""
+        if not self.gflops_budget_pinned:
+            self.gflops_budget = max([self.gflops_budget] + [cost.gflops for cost in costs])
+        if not self.memory_budget_pinned:
+            self.memory_budget = max([self.memory_budget] + [cost.memory for cost in costs])
+
+    def check(self, cost: RequestCost):
+        """413 для запроса, который не уместится в бюджет даже на пустом сервере"""
+        if cost.gflops > self.gflops_budget or cost.memory > self.memory_budget:
+            self.counters["too_large"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=(
+                    f"Запрос слишком велик: оценка {cost.gflops:.0f} GFLOPs и {cost.memory / 1024 / 1024:.0f} МБ "
+                    f"превышает бюджет сервера ({self.gflops_budget:.0f} GFLOPs, "
+                    f"{self.memory_budget / 1024 / 1024:.0f} МБ); уменьшите изображение или коэффициент"
+                )
+            )
+
+    def _fits(self, cost: RequestCost) -> bool:
+        return (
+            self.used_gflops + cost.gflops <= self.gflops_budget
+            and self.used_memory + cost.memory <= self.memory_budget
+        )
+
+    def _reserve(self, cost: RequestCost):
+        self.in_flight += 1
+        self.used_gflops += cost.gflops
+        self.used_memory += cost.memory
+
+    def _release(self, cost: RequestCost):
+        self.in_flight -= 1
+        self.used_gflops -= cost.gflops
+        self.used_memory -= cost.memory
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            waiter = self._waiters.peek()
+            cost, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+                continue
+            if not self._fits(cost):
+                break
+            self._waiters.remove(waiter)
+            self._reserve(cost)
+            future.set_result(None)
+
+    def estimated_wait(self, cost: RequestCost) -> float:
+        """Оценка ожидания до начала выполнения: время на уже принятую и ожидающую работу"""
+        pending = self.used_gflops + sum(c.gflops for c, _ in self._waiters)
+        return pending / max(self.throughput, 1e-6)
+
+    @asynccontextmanager
+    async def admit(self, cost: RequestCost, can_reject: bool = True):
+        """Допуск запроса; при can_reject=False запрос только ждет (задачи из очереди)"""
+        self.check(cost)
+        if not self._waiters and self._fits(cost):
+            self._reserve(cost)
+            self.counters["admitted"] += 1
+        else:
+            wait = self.estimated_wait(cost)
+            if can_reject and (len(self._waiters) >= self.max_queue or wait > self.max_wait):
+                self.counters["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Сервер перегружен, повторите запрос позже",
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))}
+                )
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.push(cost.gflops, (cost, future))
+            self.counters["queued"] += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Допуск уже выдан, но запрос отменен - возвращаем бюджет
+                    self._release(cost)
+                raise
+            self.counters["admitted"] += 1
+
+        started = time.perf_counter()
+        slot = AdmissionSlot(cost)
+
+        def finish(_=None):
+            elapsed = time.perf_counter() - started
+            if elapsed > 0 and cost.gflops > 0:
+                self.throughput = 0.8 * self.throughput + 0.2 * (cost.gflops / elapsed)
+            self._release(cost)
+
+        try:
+            yield slot
+        finally:
+            if slot.task is not None and not slot.task.done():
+                slot.task.add_done_callback(finish)
+            else:
+                finish()
+
+    def stats(self) -> dict:
+        return {
+            "policy": self._waiters.policy,
+            "admitted": self.counters["admitted"],
+            "queued": self.counters["queued"],
+            "rejected": self.counters["rejected"],
+            "too_large": self.counters["too_large"],
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for _, future in self._waiters if not future.done()),
+            "used_gflops": self.used_gflops,
+            "gflops_budget": self.gflops_budget,
+            "used_memory_mb": self.used_memory / 1024 / 1024,
+            "memory_budget_mb": self.memory_budget / 1024 / 1024,
+            "throughput_gflops_per_s": self.throughput,
+        }
@@ -0,0 +1,98 @@
+import io
+import os
+import time
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from utils.server_logger import ServerLogger
+
+
+class ImageEncoder:
+    """Кодирование результата в PNG/WebP/JPEG с пресетами скорость/размер.
+
+    Пресет задает параметры по умолчанию для каждого формата, явно переданные
+    параметры (quality, compress_level, lossless) их переопределяют.
+    """
+
+    FORMATS = ("png", "webp", "jpeg")
+
+    PRESETS = {
+        "fast": {
+            "png": {"compress_level": 1},
+            "webp": {"lossless": True, "quality": 80, "method": 0},
+            "jpeg": {"quality": 85, "optimize": False},
+        },
+        "balanced": {
+            "png": {"compress_level": 6},
+            "webp": {"lossless": True, "quality": 90, "method": 4},
+            "jpeg": {"quality": 92, "optimize": False},
+        },
+        "small": {
+            "png": {"compress_level": 9},
+            "webp": {"lossless": True, "quality": 100, "method": 6},
+            "jpeg": {"quality": 80, "optimize": True},
+        },
+    }
+
+    def __init__(self, default_preset: Optional[str] = None):
+        self.logger = ServerLogger()
+        self.default_preset = default_preset or os.getenv("ENCODER_PRESET", "balanced")
+        if self.default_preset not in self.PRESETS:
+            raise ValueError(f"Неизвестный пресет кодирования: {self.default_preset}")
+
+    def resolve_options(
+        self,
+        output_format: str = "png",
+        preset: Optional[str] = None,
+        quality: Optional[int] = None,
+        compress_level: Optional[int] = None,
+        lossless: Optional[bool] = None,
+    ) -> dict:
+        """Проверка и сборка параметров кодирования (ValueError при неверных значениях)"""
+        output_format = output_format.lower()
+        if output_format == "jpg":
+            output_format = "jpeg"
+        if output_format not in self.FORMATS:
+            raise ValueError(f"Неподдерживаемый формат: {output_format}")
+        preset = preset or self.default_preset
+        if preset not in self.PRESETS:
+            raise ValueError(f"Неизвестный пресет кодирования: {preset}")
+
+        options = dict(self.PRESETS[preset][output_format])
+        if quality is not None:
+            if not 1 <= quality <= 100:
+                raise ValueError("quality должно быть в диапазоне 1..100")
+            if output_format == "png":
+                raise ValueError("quality не применяется к PNG, используйте compress_level")
+            options["quality"] = quality
+        if compress_level is not None:
+            if output_format != "png":
+                raise ValueError("compress_level применяется только к PNG")
+            if not 0 <= compress_level <= 9:
+                raise ValueError("compress_level должно быть в диапазоне 0..9")
+            options["compress_level"] = compress_level
+        if lossless is not None:
+            if output_format != "webp":
+                raise ValueError("lossless применяется только к WebP")
+            options["lossless"] = lossless
+        return {"format": output_format, "preset": preset, **options}
+
+    def encode(self, image: np.ndarray, options: dict) -> bytes:
+        """Кодирование uint8-изображения (H, W, 3) с замером времени"""
+        options = dict(options)
+        output_format = options.pop("format")
+        preset = options.pop("preset", None)
+
+        started = time.perf_counter()
+        buffer = io.BytesIO()
+        Image.fromarray(image).save(buffer, format=output_format.upper(), **options)
+        elapsed = time.perf_counter() - started
+
+        data = buffer.getvalue()
+        self.logger.info(
+            f"Encoded {output_format} (preset={preset}, {options}): "
+            f"{image.shape[1]}x{image.shape[0]}, {len(data) / 1024:.0f} KB, {elapsed * 1000:.0f} ms"
+        )
+        return data
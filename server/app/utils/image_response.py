@@ -0,0 +1,56 @@
+from typing import Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+# Форматы, которые сервер умеет отдавать бинарным телом ответа
+IMAGE_MEDIA_TYPES = {
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/jpeg": "jpeg",
+}
+FORMAT_MEDIA_TYPES = {output_format: media_type for media_type, output_format in IMAGE_MEDIA_TYPES.items()}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def negotiate_image_type(accept: Optional[str]) -> Optional[str]:
+    """Выбор типа изображения по заголовку Accept.
+
+    Возвращает media type для бинарного ответа или None, если клиент ждет
+    JSON (нет Accept, application/json или */*).
+    """
+    if not accept:
+        return None
+    candidates = []
+    for order, part in enumerate(accept.split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, order, media_type.lower()))
+
+    for _, _, media_type in sorted(candidates):
+        if media_type in IMAGE_MEDIA_TYPES:
+            return media_type
+        if media_type == "image/*":
+            return "image/png"
+        if media_type in ("application/json", "*/*"):
+            return None
+    return None
+
+
+def _iter_chunks(data: bytes) -> Iterator[memoryview]:
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        yield view[start:start + CHUNK_SIZE]
+
+
+def image_streaming_response(data: bytes, media_type: str, headers: dict) -> StreamingResponse:
+    """Бинарный ответ с изображением, отдаваемый кусками без копирования буфера"""
+    headers = {**headers, "Content-Length": str(len(data))}
+    return StreamingResponse(_iter_chunks(data), media_type=media_type, headers=headers)
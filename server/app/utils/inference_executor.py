@@ -0,0 +1,98 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from utils.server_logger import ServerLogger
+
+# Объект, на котором выполняются задачи внутри процесса-воркера (режим "process")
+_worker_target = None
+
+
+def _init_worker(factory: Callable[[], Any], torch_threads: int):
+    """Инициализация процесса-воркера: создаем собственный экземпляр обработчика"""
+    global _worker_target
+    if torch_threads > 0:
+        import torch
+        torch.set_num_threads(torch_threads)
+    _worker_target = factory()
+
+
+def _call_in_worker(method_name: str, *args):
+    """Вызов метода обработчика, созданного в процессе-воркере"""
+    if _worker_target is None:
+        raise RuntimeError("Воркер инференса не инициализирован")
+    return getattr(_worker_target, method_name)(*args)
+
+
+class InferenceExecutor:
+    """Пул для CPU-bound стадий инференса, чтобы не блокировать event loop.
+
+    Режим "thread" выполняет переданные функции в пуле потоков (torch, cv2 и PIL
+    отпускают GIL на тяжелых операциях). Режим "process" выполняет методы
+    обработчика, созданного фабрикой в каждом процессе-воркере.
+    """
+
+    KINDS = ("thread", "process")
+
+    def __init__(
+        self,
+        kind: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        worker_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.logger = ServerLogger()
+        self.kind = (kind or os.getenv("INFERENCE_EXECUTOR", "thread")).lower()
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Неизвестный тип пула инференса: {self.kind}")
+        self.max_workers = max_workers or int(os.getenv("INFERENCE_WORKERS", 2))
+        # Количество потоков torch на один воркер (0 - оставить по умолчанию)
+        self.torch_threads = int(os.getenv("INFERENCE_TORCH_THREADS", 0))
+        self.worker_factory = worker_factory
+        self._pool: Optional[Executor] = None
+
+    def start(self):
+        """Создание пула (лениво, при первой задаче)"""
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            if self.worker_factory is None:
+                raise RuntimeError("Для пула процессов требуется фабрика обработчика")
+            # spawn вместо fork: OpenMP-пулы torch не переживают fork
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.worker_factory, self.torch_threads),
+            )
+        else:
+            if self.torch_threads > 0:
+                import torch
+                torch.set_num_threads(self.torch_threads)
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference",
+            )
+        self.logger.info(f"Inference executor started: kind={self.kind}, workers={self.max_workers}")
+
+    async def run(self, func: Callable, *args):
+        """Выполнение стадии в пуле.
+
+        В режиме "process" func должна быть методом обработчика: вызов передается
+        по имени в экземпляр, созданный в процессе-воркере.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        if self.kind == "process":
+            call = functools.partial(_call_in_worker, func.__name__, *args)
+        else:
+            call = functools.partial(func, *args)
+        return await loop.run_in_executor(self._pool, call)
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+            self.logger.info("Inference executor stopped")
@@ -0,0 +1,84 @@
+import asyncio
+import os
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils.server_logger import ServerLogger
+from utils.scheduler import SchedulingQueue
+
+
+class JobQueue:
+    """Внутрипроцессная очередь задач апскейла с пулом асинхронных воркеров.
+
+    Состояние задач хранится в БД обработчиком (handler), очередь держит
+    только входные данные ожидающих задач и прогресс выполняющихся.
+    Обработчик возвращает итоговый статус задачи ("done" или "failed").
+    Следующая задача выбирается политикой SchedulingQueue по оценке стоимости.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, dict], Awaitable[str]],
+        workers: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ):
+        self.logger = ServerLogger()
+        self.handler = handler
+        self.workers = workers or int(os.getenv("JOB_WORKERS", 2))
+        self.max_size = max_size if max_size is not None else int(os.getenv("JOB_QUEUE_SIZE", 100))
+        self.queue = SchedulingQueue()
+        self._available = asyncio.Condition()
+        self._tasks: List[asyncio.Task] = []
+        self._progress: Dict[str, float] = {}
+        self.counters = Counter()
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        self.logger.info(f"Job queue started: workers={self.workers}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, job_id: str, payload: dict, cost: float = 0.0):
+        """Постановка задачи со стоимостью cost в очередь (asyncio.QueueFull, если очередь заполнена)"""
+        if len(self.queue) >= self.max_size:
+            raise asyncio.QueueFull()
+        async with self._available:
+            self.queue.push(cost, (job_id, payload))
+            self._available.notify()
+        self._progress[job_id] = 0.0
+        self.counters["submitted"] += 1
+
+    def set_progress(self, job_id: str, progress: float):
+        if job_id in self._progress:
+            self._progress[job_id] = progress
+
+    def progress(self, job_id: str) -> Optional[float]:
+        return self._progress.get(job_id)
+
+    async def _worker(self, index: int):
+        while True:
+            async with self._available:
+                await self._available.wait_for(lambda: len(self.queue) > 0)
+                job_id, payload = self.queue.pop()
+            try:
+                self.counters[await self.handler(job_id, payload)] += 1
+            except Exception as e:
+                self.counters["failed"] += 1
+                self.logger.log_error(e, f"job_worker_{index}")
+            finally:
+                self._progress.pop(job_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "policy": self.queue.policy,
+            "queued": len(self.queue),
+            "running": len(self._progress) - len(self.queue),
+            **{name: self.counters[name] for name in ("submitted", "done", "failed")},
+        }
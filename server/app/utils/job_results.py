@@ -0,0 +1,115 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from utils.server_logger import ServerLogger
+
+DB_PREFIX = "db:"
+
+
+class JobResultStore:
+    """Хранилище результатов асинхронных задач с удалением по сроку хранения.
+
+    "db" (по умолчанию) - таблица job_results: результат доступен с любой
+    реплики, а не только с той, что выполняла задачу. "dir" - файлы в
+    JOB_RESULTS_DIR: при нескольких репликах каталог должен быть общим томом.
+    Ключ результата хранится в jobs.result_path, поэтому результаты, записанные
+    до смены JOB_RESULTS_STORE, остаются читаемыми.
+    """
+
+    BACKENDS = ("db", "dir")
+
+    def __init__(
+        self,
+        db_manager,
+        backend: Optional[str] = None,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.logger = ServerLogger()
+        self.db_manager = db_manager
+        self.backend = (backend or os.getenv("JOB_RESULTS_STORE", "db")).lower()
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"Неизвестное хранилище результатов задач: {self.backend}")
+        self.directory = directory or os.getenv("JOB_RESULTS_DIR", "job_results")
+        self.ttl = ttl if ttl is not None else float(os.getenv("JOB_RESULT_TTL_S", 24 * 3600))
+
+    async def save(self, job_id: str, output_format: str, data: bytes) -> str:
+        """Сохранение результата; возвращает ключ для jobs.result_path"""
+        if self.backend == "db":
+            async with self.db_manager.get_db() as db:
+                await self.db_manager.add_job_result(job_id, data, db)
+            return DB_PREFIX + job_id
+        path = os.path.join(self.directory, f"{job_id}.{output_format}")
+        await asyncio.to_thread(self._write_file, path, data)
+        return path
+
+    async def load(self, key: Optional[str]) -> Optional[bytes]:
+        """Результат по ключу или None, если он удален по сроку хранения"""
+        if not key:
+            return None
+        if key.startswith(DB_PREFIX):
+            async with self.db_manager.get_db() as db:
+                return await self.db_manager.get_job_result(key[len(DB_PREFIX):], db)
+        return await asyncio.to_thread(self._read_file, key)
+
+    async def delete(self, key: Optional[str]):
+        if not key:
+            return
+        if key.startswith(DB_PREFIX):
+            async with self.db_manager.get_db() as db:
+                await self.db_manager.delete_job_results(db, job_id=key[len(DB_PREFIX):])
+        else:
+            await asyncio.to_thread(self._remove_file, key)
+
+    async def cleanup(self) -> int:
+        """Удаление результатов старше JOB_RESULT_TTL_S (в обоих хранилищах)"""
+        if self.ttl <= 0:
+            return 0
+        async with self.db_manager.get_db() as db:
+            removed = await self.db_manager.delete_job_results(
+                db, created_before=datetime.utcnow() - timedelta(seconds=self.ttl)
+            )
+        removed += await asyncio.to_thread(self._remove_expired_files, time.time() - self.ttl)
+        if removed:
+            self.logger.info(f"Removed {removed} job results older than {self.ttl:.0f}s")
+        return removed
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_file(path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _remove_expired_files(self, modified_before: float) -> int:
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < modified_before:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
@@ -0,0 +1,145 @@
+import asyncio
+import hmac
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from utils.server_logger import ServerLogger
+
+T = TypeVar("T")
+
+# Журнал стадий профилируемого запроса: (стадия, начало, длительность); None - профилирование не идет
+_stage_log: ContextVar[Optional[list]] = ContextVar("stage_log", default=None)
+
+
+def record_stage(stage: str, started: float, elapsed: float):
+    """Отметка стадии для профиля текущего запроса (вне профилирования - одна проверка ContextVar)"""
+    log = _stage_log.get()
+    if log is not None:
+        log.append((stage, started, elapsed))
+
+
+@contextmanager
+def stage_journal():
+    """Сбор стадий, выполненных в текущем контексте: with stage_journal() as stages: ..."""
+    stages: List[tuple] = []
+    token = _stage_log.set(stages)
+    try:
+        yield stages
+    finally:
+        _stage_log.reset(token)
+
+
+def profiler_options(**options) -> dict:
+    """Параметры torch.profiler.profile: CPU (и CUDA), все потоки процесса"""
+    import torch
+    from torch.profiler import ProfilerActivity
+
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+    options = {"activities": activities, **options}
+    try:
+        # Стадии выполняются в потоках пула инференса, без этого профайлер видит только свой поток
+        options["experimental_config"] = torch._C._profiler._ExperimentalConfig(profile_all_threads=True)
+    except (AttributeError, TypeError):
+        pass
+    return options
+
+
+class RequestProfiler:
+    """Профилирование отдельных запросов по требованию.
+
+    Запрос профилируется, если заголовок X-Profile совпадает с PROFILING_TOKEN
+    (доступен только администратору) или выпал по PROFILE_SAMPLE_RATE. Выполнение
+    оборачивается в профайлер PyTorch (включая потоки пула инференса) и журнал
+    стадий, результат - Chrome trace и сводка по операциям в PROFILE_DIR, где
+    хранятся только последние PROFILE_KEEP профилей. Одновременно профилируется
+    один запрос; ops параллельных запросов тоже попадают в trace. Когда
+    профилирование выключено, проверка сводится к сравнению двух полей.
+    """
+
+    HEADER = "X-Profile"
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        output_dir: Optional[str] = None,
+        keep: Optional[int] = None,
+    ):
+        self.logger = ServerLogger()
+        self.token = token if token is not None else os.getenv("PROFILING_TOKEN", "")
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+        self.output_dir = output_dir or os.getenv("PROFILE_DIR", "profiles")
+        self.keep = keep if keep is not None else int(os.getenv("PROFILE_KEEP", 20))
+        self._busy = False
+        self.counters = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token) or self.sample_rate > 0
+
+    def requested(self, header: Optional[str]) -> bool:
+        """Нужно ли профилировать запрос с данным значением заголовка X-Profile"""
+        if not self.token and self.sample_rate <= 0:
+            return False
+        if header and self.token and hmac.compare_digest(header.encode(), self.token.encode()):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def run(self, name: str, func: Callable[[], Awaitable[T]]) -> Tuple[T, Optional[str]]:
+        """Выполнение func под профайлером: (результат, id профиля или None, если профиль не снят)"""
+        if self._busy:
+            self.counters["skipped"] += 1
+            return await func(), None
+
+        self._busy = True
+        try:
+            from torch.profiler import profile
+
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            started = time.perf_counter()
+            with stage_journal() as stages, profile(**profiler_options(record_shapes=True)) as prof:
+                result = await func()
+            elapsed = time.perf_counter() - started
+            await asyncio.to_thread(self._write, profile_id, name, prof, stages, started, elapsed)
+            self.counters["profiles"] += 1
+            self.logger.info(f"Profile {profile_id} ({name}, {elapsed * 1000:.0f} ms) written to {self.output_dir}")
+            return result, profile_id
+        finally:
+            self._busy = False
+
+    def _write(self, profile_id: str, name: str, prof, stages: list, started: float, elapsed: float):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, profile_id)
+        prof.export_chrome_trace(f"{base}.trace.json")
+        with open(f"{base}.summary.txt", "w", encoding="utf-8") as f:
+            f.write(f"{name}: {elapsed * 1000:.1f} ms\n\nStages (start offset, duration):\n")
+            for stage, stage_started, stage_elapsed in stages:
+                f.write(f"  {stage:<12} +{(stage_started - started) * 1000:9.1f} ms {stage_elapsed * 1000:9.1f} ms\n")
+            f.write("\n")
+            f.write(prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=40))
+        self._rotate()
+
+    def _rotate(self):
+        # Имена профилей начинаются с времени, поэтому сортировка по имени хронологическая
+        profiles = sorted({filename.split(".")[0] for filename in os.listdir(self.output_dir)})
+        for profile_id in profiles[:max(len(profiles) - self.keep, 0)]:
+            for suffix in (".trace.json", ".summary.txt"):
+                path = os.path.join(self.output_dir, profile_id + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "profiles": self.counters["profiles"],
+            "skipped": self.counters["skipped"],
+        }
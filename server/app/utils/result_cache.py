@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import os
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from utils.server_logger import ServerLogger
+
+
+class ResultCache:
+    """Кэш результатов апскейла, адресуемый содержимым запроса.
+
+    Ключ - SHA-256 загруженных байтов и параметров обработки. Первый уровень -
+    LRU в памяти с бюджетом в байтах, второй (опциональный) - файлы на диске
+    с вытеснением самых давно использованных при превышении размера.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: Optional[int] = None,
+        disk_dir: Optional[str] = None,
+        disk_bytes: Optional[int] = None,
+    ):
+        self.logger = ServerLogger()
+        self.memory_budget = memory_bytes if memory_bytes is not None else int(
+            os.getenv("RESULT_CACHE_MEMORY_BYTES", 256 * 1024 * 1024)
+        )
+        self.disk_dir = disk_dir if disk_dir is not None else os.getenv("RESULT_CACHE_DIR", "")
+        self.disk_budget = disk_bytes if disk_bytes is not None else int(
+            os.getenv("RESULT_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024)
+        )
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self.disk_size = 0
+        self.counters = Counter()
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(image_data: bytes, *params) -> str:
+        digest = hashlib.sha256(image_data).hexdigest()
+        return ":".join([digest, *(str(param) for param in params)])
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.counters["hits_memory"] += 1
+            return value
+
+        name = self._disk_name(key)
+        if name in self._disk:
+            value = await asyncio.to_thread(self._read_file, name)
+            if value is not None:
+                self._disk.move_to_end(name)
+                self.counters["hits_disk"] += 1
+                self._put_memory(key, value)
+                return value
+            self.disk_size -= self._disk.pop(name, 0)
+
+        self.counters["misses"] += 1
+        return None
+
+    async def put(self, key: str, value: bytes):
+        self._put_memory(key, value)
+        if not self.disk_dir or len(value) > self.disk_budget:
+            return
+
+        name = self._disk_name(key)
+        if not await asyncio.to_thread(self._write_file, name, value):
+            return
+        # Индекс диска меняется только в event loop, файловые операции - в потоках
+        self.disk_size += len(value) - self._disk.pop(name, 0)
+        self._disk[name] = len(value)
+        evicted = []
+        while self.disk_size > self.disk_budget and self._disk:
+            evicted_name, size = self._disk.popitem(last=False)
+            self.disk_size -= size
+            self.counters["evictions_disk"] += 1
+            evicted.append(evicted_name)
+        if evicted:
+            await asyncio.to_thread(self._remove_files, evicted)
+
+    def _put_memory(self, key: str, value: bytes):
+        if len(value) > self.memory_budget:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self.memory_size -= len(previous)
+        self._memory[key] = value
+        self.memory_size += len(value)
+        while self.memory_size > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_size -= len(evicted)
+            self.counters["evictions_memory"] += 1
+
+    @staticmethod
+    def _disk_name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest() + ".bin"
+
+    def _load_disk_index(self):
+        """Восстановление индекса дискового уровня (от старых файлов к новым)"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".bin"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self.disk_size += size
+
+    def _read_file(self, name: str) -> Optional[bytes]:
+        path = os.path.join(self.disk_dir, name)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            # mtime служит временем последнего использования после перезапуска
+            os.utime(path)
+        except OSError:
+            return None
+        return value
+
+    def _write_file(self, name: str, value: bytes) -> bool:
+        path = os.path.join(self.disk_dir, name)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.log_error(e, "result_cache_write")
+            return False
+        return True
+
+    def _remove_files(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            **{name: self.counters[name] for name in (
+                "hits_memory", "hits_disk", "misses", "evictions_memory", "evictions_disk"
+            )},
+            "memory_entries": len(self._memory),
+            "memory_bytes": self.memory_size,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self.disk_size,
+        }
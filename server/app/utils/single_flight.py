@@ -0,0 +1,54 @@
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых вычислений.
+
+    Пока вычисление для ключа выполняется, новые вызовы с тем же ключом не
+    запускают его повторно, а ждут результат уже идущего. Вычисление
+    выполняется в отдельной задаче, поэтому отмена одного из ожидающих
+    (например, разрыв соединения клиентом) не прерывает его для остальных.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.counters = Counter()
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[T]],
+        on_start: Optional[Callable[[asyncio.Task], None]] = None,
+    ) -> T:
+        """Результат func для ключа; on_start вызывается с задачей, если вычисление запустил этот вызов"""
+        task = self._calls.get(key)
+        if task is None:
+            self.counters["leaders"] += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            if on_start is not None:
+                on_start(task)
+        else:
+            self.counters["shared"] += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._calls.pop(key, None)
+        # Ошибка забирается здесь, даже если все ожидающие уже отменены
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.counters["leaders"],
+            "shared": self.counters["shared"],
+            "in_flight": len(self._calls),
+        }
@@ -0,0 +1,142 @@
+import io
+import os
+import warnings
+from collections import Counter
+from typing import Iterable, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+CHUNK_SIZE = 1024 * 1024
+# Запас на поля формы и границы multipart сверх размера самого файла
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class ImageHeader(NamedTuple):
+    width: int
+    height: int
+    format: str
+
+
+class UploadGuard:
+    """Проверка загруженного изображения до декодирования пикселей.
+
+    Файл читается порциями с ограничением размера, а размеры и формат берутся
+    только из заголовка изображения. Слишком большие файлы, неподдерживаемые
+    форматы и изображения, чьи размеры превышают лимиты (в том числе
+    decompression bomb - маленький файл с огромным числом пикселей), отклоняются
+    до декодирования, списания кредитов и записи в БД.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        formats: Optional[Iterable[str]] = None,
+        max_pixels: Optional[int] = None,
+    ):
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("MAX_UPLOAD_MB", 20)) * 1024 * 1024)
+        self.formats = {
+            item.strip().upper()
+            for item in (formats or os.getenv("UPLOAD_FORMATS", "PNG,JPEG,WEBP").split(","))
+            if item.strip()
+        }
+        self.max_pixels = max_pixels if max_pixels is not None else int(os.getenv("MAX_UPLOAD_PIXELS", 4096 * 4096))
+        self.counters = Counter()
+
+    def reject(self, reason: str, status_code: int, detail: str):
+        self.counters[f"rejected_{reason}"] += 1
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    async def read(self, file: UploadFile) -> bytes:
+        """Чтение файла порциями: при превышении лимита чтение прекращается (413)"""
+        chunks = []
+        size = 0
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > self.max_bytes:
+                self.reject(
+                    "size", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    f"Файл превышает {self.max_bytes / 1024 / 1024:g} МБ"
+                )
+            chunks.append(chunk)
+        if size == 0:
+            self.reject("empty", status.HTTP_400_BAD_REQUEST, "Получены пустые данные изображения")
+        return b"".join(chunks)
+
+    def inspect(self, image_data: bytes, max_side: int) -> ImageHeader:
+        """Формат и размеры по заголовку изображения (пиксели не декодируются)"""
+        try:
+            with warnings.catch_warnings():
+                # Лимит пикселей проверяется ниже, предупреждение PIL не нужно
+                warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+                with Image.open(io.BytesIO(image_data)) as img:
+                    header = ImageHeader(img.size[0], img.size[1], img.format or "")
+        except Image.DecompressionBombError:
+            self.reject("pixels", status.HTTP_400_BAD_REQUEST, "Изображение содержит слишком много пикселей")
+        except Exception:
+            self.reject("unreadable", status.HTTP_400_BAD_REQUEST, "Не удалось прочитать изображение")
+
+        if header.format.upper() not in self.formats:
+            self.reject(
+                "format", status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                f"Неподдерживаемый формат изображения: {header.format or 'unknown'}"
+            )
+        if header.width > max_side or header.height > max_side:
+            self.reject("shape", status.HTTP_400_BAD_REQUEST, f"Изображение превышает {max_side}x{max_side} пикселей")
+        if header.width * header.height > self.max_pixels:
+            self.reject("pixels", status.HTTP_400_BAD_REQUEST, "Изображение содержит слишком много пикселей")
+        self.counters["accepted"] += 1
+        return header
+
+    def stats(self) -> dict:
+        return {
+            "max_upload_mb": self.max_bytes / 1024 / 1024,
+            "formats": sorted(self.formats),
+            "max_pixels": self.max_pixels,
+            **self.counters,
+        }
+
+
+class BodySizeLimitMiddleware:
+    """ASGI-middleware: ограничение размера тела запроса для маршрутов загрузки.
+
+    Запрос с Content-Length больше лимита отклоняется сразу, без чтения тела.
+    Без Content-Length (chunked) тело считается по мере получения, и разбор
+    multipart прерывается с 413, как только лимит превышен.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        detail = {"detail": f"Тело запроса превышает {self.max_bytes / 1024 / 1024:g} МБ"}
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(detail, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI пробрасывает HTTPException из разбора тела как есть
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail["detail"])
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,38 @@
+import asyncio
+import importlib
+import os
+import sys
+
+import pytest
+
+# Модули сервера импортируются от server/app (from utils..., from model_srgan...), как при запуске main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    """ServerLogger пишет logs/ в текущий каталог: тесты не оставляют файлов в дереве"""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def fastapi_app(tmp_path, monkeypatch):
+    """Приложение на временной SQLite с частым обслуживанием задач и заглушкой модели"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    monkeypatch.setenv("JOB_RESULTS_DIR", str(tmp_path / "job_results"))
+    monkeypatch.setenv("JOB_HEARTBEAT_S", "0.05")
+    monkeypatch.setenv("JOB_LEASE_S", "0.2")
+    monkeypatch.delenv("INSTANCE_ID", raising=False)
+    application = importlib.import_module("app").FastAPIApp()
+
+    async def load_model():
+        application.srgan.ready = True
+
+    async def upscale_image_bytes(image_data, scale_factor=4, use_decoration=False, encode_options=None, progress=None):
+        # Дольше аренды и нескольких тактов обслуживания
+        await asyncio.sleep(0.6)
+        return b"upscaled"
+
+    monkeypatch.setattr(application.srgan, "load_model", load_model)
+    monkeypatch.setattr(application.srgan, "upscale_image_bytes", upscale_image_bytes)
+    return application
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from utils.admission import BYTES_PER_OUTPUT_PIXEL, DECORATION_COST_FACTOR, AdmissionController, RequestCost
+
+# Как у генератора x4: около 4,4 MFLOP на пиксель входа
+FLOPS_PER_PIXEL = 4.4e6
+
+
+def controller(**kwargs) -> AdmissionController:
+    options = {"gflops_budget": 100, "memory_budget_mb": 64, "max_queue": 4, "max_wait": 10}
+    options.update(kwargs)
+    return AdmissionController(lambda height, width, scale: height * width * FLOPS_PER_PIXEL, **options)
+
+
+def test_estimate_from_size_and_scale():
+    cost = controller().estimate(100, 200, 4, False)
+    assert cost.gflops == pytest.approx(100 * 200 * FLOPS_PER_PIXEL / 1e9)
+    assert cost.memory == 100 * 200 * 16 * BYTES_PER_OUTPUT_PIXEL
+
+
+def test_estimate_with_decoration_costs_more():
+    admission = controller()
+    plain = admission.estimate(100, 100, 4, False)
+    decorated = admission.estimate(100, 100, 4, True)
+    assert decorated.gflops == pytest.approx(plain.gflops * DECORATION_COST_FACTOR)
+    assert decorated.memory == plain.memory
+
+
+def test_fits_checks_both_budgets():
+    admission = controller()
+    assert admission._fits(RequestCost(100, 64 * 1024 * 1024))
+    assert not admission._fits(RequestCost(101, 0))
+    assert not admission._fits(RequestCost(0, 64 * 1024 * 1024 + 1))
+    admission._reserve(RequestCost(60, 0))
+    assert admission._fits(RequestCost(40, 0))
+    assert not admission._fits(RequestCost(41, 0))
+
+
+def test_fits_does_not_bypass_budget_on_idle_server():
+    assert not controller()._fits(RequestCost(1000, 0))
+
+
+def test_never_fitting_request_rejected_with_413():
+    admission = controller()
+
+    async def scenario():
+        async with admission.admit(RequestCost(1000, 0)):
+            pass
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 413
+    assert admission.stats()["too_large"] == 1
+    assert admission.in_flight == 0 and not admission._waiters
+
+
+def test_memory_over_budget_rejected_even_for_queued_jobs():
+    admission = controller()
+
+    async def scenario():
+        async with admission.admit(RequestCost(1, 65 * 1024 * 1024), can_reject=False):
+            pass
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 413
+
+
+def test_queued_request_admitted_after_release():
+    admission = controller()
+    order = []
+
+    async def request(name, gflops, hold):
+        async with admission.admit(RequestCost(gflops, 0)):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        first = asyncio.create_task(request("first", 80, 0.02))
+        await asyncio.sleep(0)
+        await asyncio.gather(first, request("second", 80, 0))
+
+    asyncio.run(scenario())
+    assert order == ["first", "second"]
+    assert admission.stats()["queued"] == 1 and admission.in_flight == 0
+
+
+def test_long_wait_rejected_with_retry_after():
+    admission = controller(max_wait=1)
+    admission.throughput = 10
+
+    async def scenario():
+        async with admission.admit(RequestCost(80, 0)):
+            async with admission.admit(RequestCost(80, 0)):
+                pass
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    # Впереди 80 GFLOPs при 10 GFLOP/s - около 8 с
+    assert error.value.status_code == 429
+    assert error.value.headers["Retry-After"] == "8"
+
+
+def test_wait_estimate_excludes_own_cost():
+    admission = controller()
+    admission.throughput = 10
+    assert admission.estimated_wait(RequestCost(90, 0)) == 0
+    admission._reserve(RequestCost(50, 0))
+    assert admission.estimated_wait(RequestCost(90, 0)) == pytest.approx(5)
+
+
+def test_calibrate_sets_throughput_unless_pinned(monkeypatch):
+    admission = controller()
+    admission.calibrate(70)
+    assert admission.throughput == 70
+
+    monkeypatch.setenv("ADMISSION_INITIAL_GFLOPS_PER_S", "200")
+    pinned = controller()
+    pinned.calibrate(70)
+    assert pinned.throughput == 200
+
+
+def test_fit_largest_extends_default_budgets_only(monkeypatch):
+    for name in ("ADMISSION_GFLOPS_BUDGET", "ADMISSION_MEMORY_BUDGET_MB"):
+        monkeypatch.delenv(name, raising=False)
+    largest = [RequestCost(50, 1024), RequestCost(40000, 6000 * 1024 * 1024)]
+
+    admission = AdmissionController(lambda height, width, scale: 0)
+    admission.fit_largest(largest)
+    assert admission.gflops_budget == 40000
+    assert admission.memory_budget == 6000 * 1024 * 1024
+
+    pinned = controller()
+    pinned.fit_largest(largest)
+    assert pinned.gflops_budget == 100 and pinned.memory_budget == 64 * 1024 * 1024
@@ -0,0 +1,45 @@
+import warnings
+
+import pytest
+import torch
+
+from model_srgan.artifact import compile_artifact, load_artifact
+from model_srgan.generator import Generator
+from model_srgan.optimization import has_batchnorm, optimize_for_inference
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    torch.manual_seed(0)
+    generator = Generator(in_channels=3).eval()
+    checkpoint = tmp_path / "srgan.pth"
+    torch.save({"generator_state_dict": generator.state_dict()}, checkpoint)
+    path = tmp_path / "generator_x4.pt"
+    compile_artifact(str(checkpoint), str(path))
+    return generator, str(path)
+
+
+def test_artifact_matches_checkpoint(artifact):
+    generator, path = artifact
+    model = load_artifact(path)
+    assert not has_batchnorm(model)
+    sample = torch.rand(1, 3, 16, 16)
+    with torch.no_grad():
+        assert torch.allclose(model(sample), generator(sample), atol=1e-5)
+
+
+def test_optimized_artifact_keeps_mapped_weights(artifact):
+    _, path = artifact
+    model = load_artifact(path)
+    weights = {parameter.data_ptr() for parameter in model.parameters()}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        optimized, report = optimize_for_inference(model, sample_size=16, iterations=1)
+
+    assert report["applied"] and report["folded_batchnorm"] == 0
+    constants = [
+        node.output().toIValue() for node in optimized.graph.nodes()
+        if node.kind() == "prim::Constant" and node.output().type().kind() == "TensorType"
+    ]
+    # Замороженный граф ссылается на веса артефакта, а не на их копии
+    assert constants and all(constant.data_ptr() in weights for constant in constants)
@@ -0,0 +1,35 @@
+import pytest
+
+from utils.image_response import CHUNK_SIZE, _iter_chunks, negotiate_image_type
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, None),
+    ("", None),
+    ("application/json", None),
+    ("*/*", None),
+    ("image/png", "image/png"),
+    ("image/webp", "image/webp"),
+    ("IMAGE/JPEG", "image/jpeg"),
+    ("image/*", "image/png"),
+    ("text/html, image/webp", "image/webp"),
+    # Порядок при равном q - как в заголовке
+    ("image/webp, image/png", "image/webp"),
+    ("image/png;q=0.5, image/webp;q=0.9", "image/webp"),
+    ("application/json;q=0.9, image/png;q=0.5", None),
+    ("image/png;q=0.5, application/json;q=0.1", "image/png"),
+    ("image/png;q=0", None),
+    ("image/png;q=oops, image/webp", "image/webp"),
+    ("image/gif", None),
+    ("image/avif, image/*;q=0.8", "image/png"),
+])
+def test_negotiate_image_type(accept, expected):
+    assert negotiate_image_type(accept) == expected
+
+
+def test_iter_chunks_covers_data_without_copies():
+    data = bytes(range(256)) * (CHUNK_SIZE // 128 + 1)
+    chunks = list(_iter_chunks(data))
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    assert all(len(chunk) == CHUNK_SIZE for chunk in chunks[:-1])
+    assert b"".join(chunks) == data
@@ -0,0 +1,118 @@
+import asyncio
+import io
+from datetime import datetime, timedelta
+
+import httpx
+from PIL import Image
+
+from db.model_db import User
+
+PASSWORD = "job-recovery-password"
+
+
+def png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), (10, 20, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def start(application) -> tuple:
+    await application.app.router.startup()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=application.app), base_url="http://test")
+    await client.post("/register", json={"email": "jobs@example.com", "password": PASSWORD})
+    async with application.db_manager.get_db() as db:
+        user = await application.db_manager.get_user_by_email("jobs@example.com", db)
+        user.money = 100
+        await db.commit()
+    token = (await client.post("/token", data={"username": "jobs@example.com", "password": PASSWORD})).json()
+    return client, {"Authorization": f"Bearer {token['access_token']}"}
+
+
+def test_own_job_survives_maintenance_ticks(fastapi_app):
+    async def scenario():
+        client, headers = await start(fastapi_app)
+        try:
+            response = await client.post("/jobs", files={"file": ("a.png", png(), "image/png")}, headers=headers)
+            job = response.json()["job"]
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                job = (await client.get(f"/jobs/{job['id']}", headers=headers)).json()["job"]
+                if job["status"] in ("done", "failed"):
+                    break
+            result = await client.get(f"/jobs/{job['id']}/result", headers=headers)
+            money = (await client.get("/current-money", headers=headers)).json()
+            return job, result, money
+        finally:
+            await client.aclose()
+            await fastapi_app.cleanup()
+
+    job, result, money = asyncio.run(scenario())
+    assert job["status"] == "done", job
+    assert result.status_code == 200 and result.content == b"upscaled"
+    # Кредиты списаны и не возвращены обслуживанием
+    assert money["balance"] == 100 - job["cost"]
+
+
+def test_maintenance_reclaims_only_expired_leases_of_other_replicas(fastapi_app):
+    async def scenario():
+        await fastapi_app.db_manager.create_tables()
+        manager = fastapi_app.db_manager
+        now = datetime.utcnow()
+        async with manager.get_db() as db:
+            user = User(email="owner@example.com", hashed_password="x", money=0)
+            db.add(user)
+            await db.commit()
+            for job_id, owner, heartbeat in [
+                ("mine-stale", fastapi_app.instance_id, now - timedelta(seconds=600)),
+                ("other-live", "other", now),
+                ("other-stale", "other", now - timedelta(seconds=600)),
+            ]:
+                await manager.add_job({
+                    "id": job_id, "user_id": user.id, "scale_factor": 4, "encode_options": "{}",
+                    "cost": 5, "owner": owner, "heartbeat_at": heartbeat, "status": "running",
+                }, db)
+        failed = await fastapi_app.fail_interrupted_jobs()
+        async with manager.get_db() as db:
+            statuses = {job_id: (await manager.get_job(job_id, db)).status
+                        for job_id in ("mine-stale", "other-live", "other-stale")}
+            user = await manager.get_user_by_email("owner@example.com", db)
+        await fastapi_app.cleanup()
+        return failed, statuses, user.money
+
+    failed, statuses, money = asyncio.run(scenario())
+    assert failed == 1
+    assert statuses == {"mine-stale": "running", "other-live": "running", "other-stale": "failed"}
+    assert money == 5
+
+
+def test_cached_job_marked_done_only_after_result_saved(fastapi_app, monkeypatch):
+    seen = []
+    save = fastapi_app.job_results.save
+
+    async def recording_save(job_id, output_format, data):
+        async with fastapi_app.db_manager.get_db() as db:
+            seen.append((await fastapi_app.db_manager.get_job(job_id, db)).status)
+        return await save(job_id, output_format, data)
+
+    async def scenario():
+        client, headers = await start(fastapi_app)
+        try:
+            first = (await client.post("/jobs", files={"file": ("a.png", png(), "image/png")}, headers=headers)).json()
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                job = (await client.get(f"/jobs/{first['job']['id']}", headers=headers)).json()["job"]
+                if job["status"] == "done":
+                    break
+            monkeypatch.setattr(fastapi_app.job_results, "save", recording_save)
+            cached = (await client.post("/jobs", files={"file": ("a.png", png(), "image/png")}, headers=headers)).json()
+            result = await client.get(f"/jobs/{cached['job']['id']}/result", headers=headers)
+            return cached, result
+        finally:
+            await client.aclose()
+            await fastapi_app.cleanup()
+
+    cached, result = asyncio.run(scenario())
+    # Во время записи результата задача еще не done: GET не может получить 410
+    assert seen == ["running"]
+    assert cached["job"]["status"] == "done" and cached["job"]["cost"] == 0
+    assert result.status_code == 200 and result.content == b"upscaled"
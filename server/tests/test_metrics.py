@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from model_srgan.srgan_wrapper import SRGANWrapper
+from utils.metrics import DB_SECONDS, Histogram, MetricsRegistry, timed_db
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test durations", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, stage="decode")
+
+    assert histogram.render() == [
+        "# HELP test_seconds Test durations",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="decode",le="0.1"} 1',
+        'test_seconds_bucket{stage="decode",le="1.0"} 3',
+        'test_seconds_bucket{stage="decode",le="+Inf"} 4',
+        'test_seconds_sum{stage="decode"} 6.05',
+        'test_seconds_count{stage="decode"} 4',
+    ]
+
+
+def test_histogram_series_per_label_set():
+    histogram = Histogram("test_seconds", "Test durations", ("scale_factor", "decoration"), buckets=(1.0,))
+    histogram.observe(0.5, scale_factor=4, decoration=False)
+    histogram.observe(0.5, scale_factor=8, decoration=True)
+
+    counts = [line for line in histogram.render() if line.startswith("test_seconds_count")]
+    # bool в метках - в нижнем регистре
+    assert counts == [
+        'test_seconds_count{scale_factor="4",decoration="false"} 1',
+        'test_seconds_count{scale_factor="8",decoration="true"} 1',
+    ]
+
+
+def test_value_on_bucket_bound_counts_in_that_bucket():
+    histogram = Histogram("test_seconds", "Test durations", buckets=(1.0, 2.0))
+    histogram.observe(1.0)
+    assert 'test_seconds_bucket{le="1.0"} 1' in histogram.render()
+
+
+def test_registry_renders_gauges_and_content_type():
+    registry = MetricsRegistry()
+    registry.histogram("test_seconds", "Test durations", buckets=(1.0,)).observe(0.5)
+    registry.gauge("test_queue", "Queue depth", lambda: 3)
+    # Повторная регистрация заменяет источник значения
+    registry.gauge("test_queue", "Queue depth", lambda: 7)
+
+    text = registry.render()
+    assert text.endswith("\n")
+    assert "# TYPE test_queue gauge\ntest_queue 7.0\n" in text
+    assert text.count("# TYPE test_seconds histogram") == 1
+    assert MetricsRegistry.CONTENT_TYPE.startswith("text/plain; version=0.0.4")
+
+
+def test_timed_db_records_operation_name():
+    class Manager:
+        @timed_db
+        async def get_user(self):
+            return "user"
+
+    assert asyncio.run(Manager().get_user()) == "user"
+    assert any('operation="get_user"' in line for line in DB_SECONDS.render())
+
+
+@pytest.mark.parametrize("scale_factor", [2, 4, 8])
+def test_supported_scale_factors_accepted(scale_factor):
+    SRGANWrapper.check_scale_factor(scale_factor)
+
+
+@pytest.mark.parametrize("scale_factor", [0, 3, 16, -4])
+def test_unsupported_scale_factor_rejected(scale_factor):
+    with pytest.raises(HTTPException) as error:
+        SRGANWrapper.check_scale_factor(scale_factor)
+    assert error.value.status_code == 400
+
+
+def test_output_limit_admits_4k_at_x4(monkeypatch):
+    for name in ("MAX_OUTPUT_MPIX", "MAX_OUTPUT_MPIX_X4", "MAX_OUTPUT_MPIX_X8"):
+        monkeypatch.delenv(name, raising=False)
+    SRGANWrapper.check_output_size(3840, 2160, 4)
+    with pytest.raises(HTTPException) as error:
+        SRGANWrapper.check_output_size(3840, 2160, 8)
+    assert error.value.status_code == 400
@@ -0,0 +1,38 @@
+import pytest
+import torch
+
+from model_srgan.backends import OnnxGenerator, export_onnx
+from model_srgan.generator import Generator
+
+# onnx нужен для экспорта, onnxruntime - для прогона (requirements-onnx.txt)
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+
+@pytest.fixture(scope="module")
+def generators(tmp_path_factory):
+    torch.manual_seed(0)
+    model = Generator(in_channels=3, upsampling_blocks=1).eval()
+    path = str(tmp_path_factory.mktemp("onnx") / "generator.onnx")
+    export_onnx(model, path)
+    return model, OnnxGenerator(path)
+
+
+# Динамические оси: batch, высота и ширина не совпадают с формой экспорта
+@pytest.mark.parametrize("shape", [(1, 3, 64, 64), (1, 3, 17, 41), (2, 3, 32, 24)])
+def test_onnx_matches_eager(generators, shape):
+    model, onnx_model = generators
+    sample = torch.rand(*shape)
+    with torch.no_grad():
+        expected = model(sample)
+    output = onnx_model(sample)
+    assert output.shape == expected.shape
+    assert torch.allclose(output, expected, atol=1e-4)
+
+
+def test_onnx_accepts_channels_last_input(generators):
+    model, onnx_model = generators
+    # Буферы пула на входе генератора - channels_last
+    sample = torch.rand(1, 3, 20, 28).contiguous(memory_format=torch.channels_last)
+    with torch.no_grad():
+        assert torch.allclose(onnx_model(sample), model(sample), atol=1e-4)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+import torch
+
+from model_srgan.generator import Generator
+from model_srgan.quantization import compare_outputs, psnr, quantize_generator, ssim
+
+
+@pytest.fixture
+def generator():
+    torch.manual_seed(0)
+    return Generator(in_channels=3, num_channels=8, num_blocks=2).eval()
+
+
+def test_psnr_and_ssim_of_identical_images():
+    image = np.random.default_rng(0).random((32, 32, 3)).astype(np.float32)
+    assert psnr(image, image) == float("inf")
+    assert ssim(image, image) == pytest.approx(1.0)
+
+
+def test_psnr_of_known_error():
+    reference = np.zeros((8, 8, 3))
+    # MSE = 0.01 -> 20 дБ
+    assert psnr(reference, reference + 0.1) == pytest.approx(20.0)
+
+
+def test_quantization_keeps_sensitive_parts_in_float(generator):
+    samples = [torch.rand(1, 3, 16, 16) for _ in range(2)]
+    quantized = quantize_generator(generator, samples)
+    modules = dict(quantized.named_modules())
+    float_convs = [name for name, module in modules.items() if type(module) is torch.nn.Conv2d]
+    assert any(name.startswith("initial") for name in float_convs)
+    assert any(name.startswith("final") for name in float_convs)
+    assert any(name.startswith("upsampling_blocks") for name in float_convs)
+    assert any(type(module).__module__.startswith("torch.ao.nn.quantized") for module in modules.values())
+    # Сложения остаточных связей и tanh остаются во float
+    targets = {str(node.target) for node in quantized.graph.nodes if node.op == "call_function"}
+    assert not any("quantized" in target for target in targets if "add" in target or "tanh" in target)
+    assert quantized(samples[0]).dtype == torch.float32
+
+
+def test_compare_outputs_of_same_model(generator):
+    quality = compare_outputs(generator, generator, [torch.rand(1, 3, 8, 8)])
+    assert quality["psnr"] == float("inf") and quality["ssim"] == pytest.approx(1.0)
@@ -0,0 +1,87 @@
+import asyncio
+import os
+
+from utils.result_cache import ResultCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_make_key_depends_on_content_and_params():
+    key = ResultCache.make_key(b"image", 4, False)
+    assert key == ResultCache.make_key(b"image", 4, False)
+    assert key != ResultCache.make_key(b"image", 2, False)
+    assert key != ResultCache.make_key(b"other", 4, False)
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = ResultCache(memory_bytes=10, disk_dir="")
+
+    async def scenario():
+        await cache.put("a", b"aaaa")
+        await cache.put("b", b"bbbb")
+        # Обращение к "a" делает его свежее "b"
+        assert await cache.get("a") == b"aaaa"
+        await cache.put("c", b"cccc")
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    assert run(scenario()) == (b"aaaa", None, b"cccc")
+    stats = cache.stats()
+    assert stats["evictions_memory"] == 1
+    assert stats["memory_bytes"] == 8
+    assert stats["misses"] == 1
+
+
+def test_memory_skips_values_over_budget():
+    cache = ResultCache(memory_bytes=4, disk_dir="")
+    run(cache.put("big", b"0123456789"))
+    assert run(cache.get("big")) is None
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_overwrite_updates_memory_size():
+    cache = ResultCache(memory_bytes=100, disk_dir="")
+    run(cache.put("a", b"1234"))
+    run(cache.put("a", b"12"))
+    assert cache.stats()["memory_bytes"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    disk_dir = str(tmp_path / "cache")
+    run(ResultCache(memory_bytes=100, disk_dir=disk_dir).put("a", b"payload"))
+
+    restarted = ResultCache(memory_bytes=100, disk_dir=disk_dir)
+    assert restarted.stats()["disk_entries"] == 1
+    assert run(restarted.get("a")) == b"payload"
+    # Прочитанное с диска поднимается в память
+    assert run(restarted.get("a")) == b"payload"
+    stats = restarted.stats()
+    assert (stats["hits_disk"], stats["hits_memory"]) == (1, 1)
+
+
+def test_disk_tier_evicts_oldest_files(tmp_path):
+    disk_dir = str(tmp_path / "cache")
+    cache = ResultCache(memory_bytes=0, disk_dir=disk_dir, disk_bytes=10)
+
+    async def scenario():
+        await cache.put("a", b"aaaa")
+        await cache.put("b", b"bbbb")
+        await cache.put("c", b"cccc")
+        return await cache.get("a"), await cache.get("c")
+
+    assert run(scenario()) == (None, b"cccc")
+    assert cache.stats()["evictions_disk"] == 1
+    assert len([name for name in os.listdir(disk_dir) if name.endswith(".bin")]) == 2
+
+
+def test_missing_disk_file_is_a_miss(tmp_path):
+    disk_dir = str(tmp_path / "cache")
+    cache = ResultCache(memory_bytes=0, disk_dir=disk_dir)
+    run(cache.put("a", b"payload"))
+    for name in os.listdir(disk_dir):
+        os.remove(os.path.join(disk_dir, name))
+
+    assert run(cache.get("a")) is None
+    assert cache.stats()["disk_entries"] == 0
+    assert cache.stats()["disk_bytes"] == 0
@@ -0,0 +1,43 @@
+import pytest
+
+import utils.scheduler as scheduler
+from utils.scheduler import SchedulingQueue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(scheduler.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_fifo_keeps_arrival_order(clock):
+    queue = SchedulingQueue("fifo")
+    for cost in (500, 5, 50):
+        queue.push(cost, cost)
+    assert [queue.pop() for _ in range(3)] == [500, 5, 50]
+
+
+def test_sjf_serves_cheapest_first(clock):
+    queue = SchedulingQueue("sjf", half_life=60)
+    for cost in (500, 5, 50):
+        queue.push(cost, cost)
+    assert [queue.pop() for _ in range(3)] == [5, 50, 500]
+
+
+def test_sjf_aging_is_proportional_to_cost(clock):
+    queue = SchedulingQueue("sjf", half_life=60)
+    queue.push(22000, "large")
+    # В 124 раза дороже мелкого: обгоняет свежие мелкие после 60 * log2(124) ~ 417 с
+    clock[0] = 400
+    queue.push(177, "small")
+    assert queue.peek() == "small"
+    queue.remove("small")
+    clock[0] = 420
+    queue.push(177, "small")
+    assert queue.peek() == "large"
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        SchedulingQueue("lifo")
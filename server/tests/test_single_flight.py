@@ -0,0 +1,53 @@
+import asyncio
+
+from utils.admission import AdmissionController
+from utils.single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_computation():
+    flight = SingleFlight()
+    calls, started = [], []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("key", compute, on_start=started.append) for _ in range(3)])
+
+    assert asyncio.run(scenario()) == ["result"] * 3
+    assert len(calls) == 1
+    # on_start получает задачу только у вызова, запустившего вычисление
+    assert len(started) == 1
+    assert flight.stats() == {"leaders": 1, "shared": 2, "in_flight": 0}
+
+
+def test_cancelled_leader_keeps_admission_until_computation_ends():
+    flight = SingleFlight()
+    admission = AdmissionController(lambda height, width, scale: 1e9, gflops_budget=10, memory_budget_mb=1)
+
+    async def scenario():
+        done = asyncio.Event()
+
+        async def compute():
+            await done.wait()
+            return "result"
+
+        async def leader():
+            async with admission.admit(admission.estimate(1, 1, 4, False)) as slot:
+                return await flight.do("key", compute, on_start=slot.hold_until)
+
+        request = asyncio.create_task(leader())
+        follower = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        # Клиент-лидер отключился, но общее вычисление продолжается для второго запроса
+        request.cancel()
+        await asyncio.sleep(0.01)
+        held = admission.in_flight
+        done.set()
+        result = await follower
+        await asyncio.sleep(0)
+        return held, result, admission.in_flight
+
+    assert asyncio.run(scenario()) == (1, "result", 0)
@@ -0,0 +1,80 @@
+import pytest
+import torch
+
+from model_srgan.srgan_wrapper import SRGANWrapper
+from model_srgan.tiling import TileBlender, TileGrid, tile_positions
+
+
+def test_tile_positions_cover_length():
+    assert tile_positions(100, 128, 16) == [0]
+    positions = tile_positions(300, 128, 16)
+    assert positions[0] == 0 and positions[-1] == 300 - 128
+    # Соседние тайлы перекрываются не меньше чем на overlap
+    assert all(b - a <= 128 - 16 for a, b in zip(positions, positions[1:]))
+
+
+def test_grid_rejects_overlap_not_smaller_than_tile():
+    with pytest.raises(ValueError):
+        TileGrid(100, 100, 32, 32)
+
+
+def blend(image: torch.Tensor, grid: TileGrid, scale: int, transform=lambda tile, output: output) -> torch.Tensor:
+    """Сборка результата из тайлов, вырезанных из готового выхода image"""
+    blender = TileBlender(grid, scale, image.shape[1])
+    for tile in grid:
+        output = image[:, :, tile.y * scale:(tile.y + tile.height) * scale, tile.x * scale:(tile.x + tile.width) * scale]
+        blender.add(tile, transform(tile, output.clone()))
+    return blender.result()
+
+
+@pytest.mark.parametrize("height, width, tile_size, overlap, scale", [
+    (300, 517, 128, 16, 4),
+    (100, 90, 128, 16, 2),
+    (257, 256, 64, 8, 4),
+    (600, 130, 256, 32, 2),
+])
+def test_blend_reconstructs_consistent_tiles(height, width, tile_size, overlap, scale):
+    # Если тайлы согласованы на перекрытиях, смешивание не должно оставлять швов
+    image = torch.rand(1, 3, height * scale, width * scale)
+    grid = TileGrid(height, width, tile_size, overlap)
+    assert torch.allclose(blend(image, grid, scale), image, atol=1e-5)
+
+
+def test_blend_seams_are_smooth():
+    # Тайлы с разным постоянным смещением: на шве значение меняется плавно, без скачка
+    scale, overlap = 2, 16
+    grid = TileGrid(64, 112, 64, overlap)
+    image = torch.zeros(1, 1, 64 * scale, 112 * scale)
+    result = blend(image, grid, scale, lambda tile, output: output + tile.x)
+    row = result[0, 0, 0]
+    assert row[0].item() == pytest.approx(0)
+    assert row[-1].item() == pytest.approx(grid.tiles[-1].x)
+    assert (row[1:] - row[:-1]).abs().max().item() < grid.tiles[-1].x / (overlap * scale) * 1.01
+    assert bool((row[1:] >= row[:-1] - 1e-5).all())
+
+
+def test_blender_keeps_only_per_axis_weights():
+    grid = TileGrid(300, 300, 128, 16)
+    blender = TileBlender(grid, 4)
+    assert blender.row_weights.shape == (1200,)
+    assert blender.col_weights.shape == (1200,)
+    assert not hasattr(blender, "weights")
+
+
+@pytest.mark.parametrize("env, max_shape, tile_size", [
+    ({}, 1000, 0),
+    ({"TILE_SIZE": "256"}, 4096, 256),
+    ({"TILE_SIZE": "256", "MAX_SHAPE": "1500", "MAX_TILED_SHAPE": "2048"}, 2048, 256),
+])
+def test_tiling_is_opt_in(monkeypatch, env, max_shape, tile_size):
+    for name in ("TILE_SIZE", "MAX_SHAPE", "MAX_TILED_SHAPE"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    wrapper = SRGANWrapper()
+    try:
+        assert wrapper.tile_size == tile_size
+        # Без TILE_SIZE вход ограничен MAX_SHAPE, как и без тайлового режима
+        assert wrapper.max_input_shape() == max_shape
+    finally:
+        wrapper.shutdown()
@@ -0,0 +1,136 @@
+import asyncio
+import io
+import struct
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from PIL import Image
+
+from utils.upload_guard import BodySizeLimitMiddleware, UploadGuard
+
+
+def encode(size=(8, 6), image_format="PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (10, 20, 30)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def png_header(width: int, height: int) -> bytes:
+    """PNG с огромными размерами в IHDR и почти пустым IDAT: файл в сотню байт"""
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", ihdr)
+        + png_chunk(b"IDAT", zlib.compress(b"\x00")) + png_chunk(b"IEND", b"")
+    )
+
+
+def rejected(call) -> HTTPException:
+    with pytest.raises(HTTPException) as error:
+        call()
+    return error.value
+
+
+def test_inspect_reads_size_and_format():
+    header = UploadGuard().inspect(encode((8, 6)), max_side=100)
+    assert (header.width, header.height, header.format) == (8, 6, "PNG")
+
+
+def test_inspect_rejects_unsupported_format():
+    guard = UploadGuard(formats=["PNG"])
+    assert rejected(lambda: guard.inspect(encode(image_format="GIF"), 100)).status_code == 415
+    assert guard.stats()["rejected_format"] == 1
+
+
+def test_inspect_rejects_unreadable_data():
+    guard = UploadGuard()
+    assert rejected(lambda: guard.inspect(b"not an image", 100)).status_code == 400
+    assert guard.stats()["rejected_unreadable"] == 1
+
+
+def test_inspect_rejects_side_over_limit():
+    guard = UploadGuard()
+    assert rejected(lambda: guard.inspect(encode((120, 10)), max_side=100)).status_code == 400
+    assert guard.stats()["rejected_shape"] == 1
+
+
+def test_inspect_rejects_pixel_count_over_limit():
+    guard = UploadGuard(max_pixels=50)
+    assert rejected(lambda: guard.inspect(encode((8, 8)), max_side=100)).status_code == 400
+    assert guard.stats()["rejected_pixels"] == 1
+
+
+def test_inspect_rejects_decompression_bomb_from_header():
+    # 40000x40000 при нескольких десятках байт: отказ без декодирования пикселей
+    data = png_header(40000, 40000)
+    guard = UploadGuard()
+    assert len(data) < 100
+    assert rejected(lambda: guard.inspect(data, max_side=100000)).status_code == 400
+    assert guard.stats()["rejected_pixels"] == 1
+
+
+def test_read_returns_file_contents():
+    data = encode()
+    assert asyncio.run(UploadGuard().read(UploadFile(io.BytesIO(data)))) == data
+
+
+def test_read_stops_over_size_limit():
+    guard = UploadGuard(max_bytes=1000)
+    upload = UploadFile(io.BytesIO(b"x" * 1001))
+    assert rejected(lambda: asyncio.run(guard.read(upload))).status_code == 413
+    assert guard.stats()["rejected_size"] == 1
+
+
+def test_read_rejects_empty_file():
+    guard = UploadGuard()
+    assert rejected(lambda: asyncio.run(guard.read(UploadFile(io.BytesIO(b""))))).status_code == 400
+
+
+def limited_app(max_bytes: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=max_bytes, paths=("/upload",))
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/other")
+    async def other(request: Request):
+        return {"size": len(await request.body())}
+
+    return app
+
+
+def post(app: FastAPI, path: str, content) -> httpx.Response:
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, content=content)
+
+    return asyncio.run(send())
+
+
+def test_middleware_passes_small_bodies():
+    response = post(limited_app(100), "/upload", b"x" * 100)
+    assert response.status_code == 200 and response.json() == {"size": 100}
+
+
+def test_middleware_rejects_by_content_length():
+    assert post(limited_app(100), "/upload", b"x" * 101).status_code == 413
+
+
+def test_middleware_rejects_chunked_body_while_streaming():
+    async def chunks():
+        for _ in range(5):
+            yield b"x" * 50
+
+    assert post(limited_app(100), "/upload", chunks()).status_code == 413
+
+
+def test_middleware_ignores_other_paths():
+    assert post(limited_app(100), "/other", b"x" * 500).status_code == 200
@@ -0,0 +1,24 @@
+import asyncio
+
+
+def test_only_leader_writes_shared_result_to_cache(fastapi_app, monkeypatch):
+    puts = []
+    put = fastapi_app.result_cache.put
+
+    async def recording_put(key, value):
+        puts.append(key)
+        await put(key, value)
+
+    monkeypatch.setattr(fastapi_app.result_cache, "put", recording_put)
+
+    async def scenario():
+        requests = [
+            fastapi_app.run_upscale(b"image", 4, False, {"format": "png"}, "key")
+            for _ in range(3)
+        ]
+        return await asyncio.gather(*requests)
+
+    results = asyncio.run(scenario())
+    assert results == [b"upscaled"] * 3
+    assert puts == ["key"]
+    assert fastapi_app.inflight.stats()["shared"] == 2